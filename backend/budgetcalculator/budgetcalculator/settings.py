@@ -32,6 +32,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'expenses.profiling.RequestProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'budgetcalculator.urls'
@@ -151,6 +152,36 @@ SWAGGER_SETTINGS = {
     },
 }
 
+# On-demand profilozás: X-Profile: 1 fejléc vagy ?_profile=1 (staff vagy PROFILE_TOKEN)
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False') == 'True'
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_DIR = BASE_DIR / 'profiles'
+# Ennyi legutóbbi profil marad meg a PROFILE_DIR-ben, a régebbiek törlődnek
+PROFILE_MAX_ARTIFACTS = 200
+
+# Hi/lo ID kiosztás (expenses/idalloc.py): processzenként lefoglalt blokk mérete,
+# és hogy a blokk mekkora hányadánál kezdődjön a következő háttérben történő foglalása
+ID_BLOCK_SIZE = 50
+ID_BLOCK_REFILL_RATIO = 0.25
+
+# Változásnapló (expenses/changelog.py): ennyi bejegyzés marad meg a compact_changelog után
+CHANGE_LOG_MAX_ENTRIES = 10000
+
+# Háttér riport feladatok (expenses/jobs.py): párhuzamos feladatok száma, az éves riport
+# havi bontását számoló processzek száma, a heartbeat gyakorisága, és ennyi ideig frissítetlen
+# heartbeat után számít egy feladat gazdátlannak
+JOBS_MAX_WORKERS = 2
+JOBS_REPORT_PROCESSES = 4
+JOBS_HEARTBEAT_SECONDS = 10
+JOBS_STALE_SECONDS = 60
+
+# Oszlopos EXPENSES pillanatkép (expenses/snapshot.py, manage.py build_snapshot)
+SNAPSHOT_DIR = BASE_DIR / 'snapshots'
+
+# Költések kötegelt törlése (expenses/purge.py): kötegméret és várakozás két köteg között
+PURGE_BATCH_SIZE = 500
+PURGE_PAUSE_SECONDS = 0.1
+
 REDOC_SETTINGS = {
    'LAZY_RENDERING': False,
 }
\ No newline at end of file
@@ -4,6 +4,7 @@ from django.shortcuts import redirect
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from expenses import profiling
 
 def home_redirect(request):
     """Redirect root URL to Swagger documentation"""
@@ -24,6 +25,9 @@ schema_view = get_schema_view(
 
 urlpatterns = [
     path('', home_redirect, name='home'),  # Root URL redirect
+    # Profilok az admin alatt, az admin catch-all előtt kell lennie
+    path('admin/profiles/', profiling.profile_list, name='profile_list'),
+    path('admin/profiles/<str:name>/<str:kind>', profiling.profile_download, name='profile_download'),
     path('admin/', admin.site.urls),
     path('', include('expenses.urls')),
     
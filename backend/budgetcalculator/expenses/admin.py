@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Types, Expenses
+from .models import Types, Expenses, ReportJobs
 
 @admin.register(Types)
 class TypesAdmin(admin.ModelAdmin):
@@ -13,4 +13,12 @@ class ExpensesAdmin(admin.ModelAdmin):
     list_filter = ['type_id', 'date_exp']
     search_fields = ['comment']
     date_hierarchy = 'date_exp'
-    ordering = ['-date_exp']
\ No newline at end of file
+    ordering = ['-date_exp']
+
+@admin.register(ReportJobs)
+class ReportJobsAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'progress', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status']
+    readonly_fields = ['kind', 'params', 'params_key', 'status', 'progress', 'data_version',
+                       'result', 'error', 'owner', 'heartbeat_at', 'created_at', 'started_at', 'finished_at']
+    ordering = ['-id']
\ No newline at end of file
@@ -0,0 +1,211 @@
+# expenses/budget_index.py
+# Típusonkénti kumulált napi költés index (prefix összeg), hogy tetszőleges
+# időszak költése két kereséssel megválaszolható legyen az EXPENSES szkennelése nélkül.
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from django.db import IntegrityError, connection, transaction
+
+from .changelog import locking_read_hint
+
+
+def _to_date(value):
+    # SQLite raw cursor szövegként adja vissza a dátumot
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _cum_before(op, hint=''):
+    """
+    A (TYPE_ID, DAY) kulcson két index kereséssel: az utolsó op nap (pl. '<=' date_to) kumulált összege,
+    vagy 0, ha nincs ilyen nap. Paraméterei: type_id, type_id, nap.
+    """
+    return f"""COALESCE((
+        SELECT p.CUM_COST FROM TYPE_DAILY_COST p{hint}
+        WHERE p.TYPE_ID = %s AND p.DAY = (
+            SELECT MAX(m.DAY) FROM TYPE_DAILY_COST m{hint}
+            WHERE m.TYPE_ID = %s AND m.DAY {op} %s
+        )
+    ), 0)"""
+
+
+class CumulativeCostIndex:
+    """
+    A TYPE_DAILY_COST tábla soraiban típusonként és naponként tároljuk a napi
+    összeget (DAY_COST) és az adott napig kumulált összeget (CUM_COST).
+    Egy időszak költése a két határnap kumulált összegének különbsége.
+    """
+
+    # --- Olvasás ---
+
+    def spent(self, type_id, date_from, date_to):
+        """A type_id típus összes költése date_from és date_to között (mindkettő zárt)."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {_cum_before('<=')} - {_cum_before('<')}",
+                [type_id, type_id, date_to, type_id, type_id, date_from]
+            )
+            return cursor.fetchone()[0]
+
+    # --- Írás ---
+
+    def expense_changed(self, old=None, new=None):
+        """
+        Egy költés létrehozásának/módosításának/törlésének bevezetése az indexbe.
+        old és new: (type_id, date, cost) hármas vagy None.
+        A hívó tranzakciójában kell futnia, hogy az index és az EXPENSES konzisztens maradjon.
+        """
+        for entry, sign in ((old, -1), (new, 1)):
+            if entry is None:
+                continue
+            type_id, day, cost = entry
+            if day is None or not cost:
+                continue
+            self._add(type_id, _to_date(day), sign * cost)
+
+    def _add(self, type_id, day, delta):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # A későbbi napok kumulált összege eltolódik
+                cursor.execute("""
+                    UPDATE TYPE_DAILY_COST
+                    SET CUM_COST = CUM_COST + %s
+                    WHERE TYPE_ID = %s AND DAY > %s
+                """, [delta, type_id, day])
+
+                if self._update_day(cursor, type_id, day, delta):
+                    # A nullára csökkent nap nem változtat a prefix összegen, törölhető
+                    cursor.execute("""
+                        DELETE FROM TYPE_DAILY_COST
+                        WHERE TYPE_ID = %s AND DAY = %s AND DAY_COST = 0
+                    """, [type_id, day])
+                    return
+                try:
+                    with transaction.atomic():
+                        # Zároló olvasás: READ_COMMITTED_SNAPSHOT mellett egy párhuzamosan beszúrt korábbi nap
+                        # régi verzióját látnánk, és annak deltája végleg hiányozna ebből a CUM_COST-ból
+                        cursor.execute(f"""
+                            INSERT INTO TYPE_DAILY_COST (TYPE_ID, DAY, DAY_COST, CUM_COST)
+                            SELECT %s, %s, %s, {_cum_before('<', locking_read_hint())} + %s
+                        """, [type_id, day, delta, type_id, type_id, day, delta])
+                except IntegrityError:
+                    # Párhuzamos kérés közben beszúrta ugyanazt a napot
+                    self._update_day(cursor, type_id, day, delta)
+
+    def expenses_removed(self, rows):
+        """
+        Több költés törlése egyszerre: (type_id, date, cost) hármasok, a hívó tranzakciójában.
+        A napi összegek csökkentése után típusonként egyetlen utasítás számolja újra a kumulált
+        összegeket a legkorábbi érintett naptól, napi suffix UPDATE-ek helyett.
+        """
+        daily = defaultdict(int)
+        for type_id, day, cost in rows:
+            if day is None or not cost:
+                continue
+            daily[(type_id, _to_date(day))] += cost
+        if not daily:
+            return
+
+        first_days = {}
+        for type_id, day in daily:
+            first_days[type_id] = min(day, first_days.get(type_id, day))
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.executemany("""
+                    UPDATE TYPE_DAILY_COST
+                    SET DAY_COST = DAY_COST - %s
+                    WHERE TYPE_ID = %s AND DAY = %s
+                """, [(total, type_id, day) for (type_id, day), total in daily.items()])
+                for type_id, day in first_days.items():
+                    cursor.execute(*_recompute_from(type_id, day))
+                    cursor.execute("""
+                        DELETE FROM TYPE_DAILY_COST
+                        WHERE TYPE_ID = %s AND DAY >= %s AND DAY_COST = 0
+                    """, [type_id, day])
+
+    @staticmethod
+    def _update_day(cursor, type_id, day, delta):
+        cursor.execute("""
+            UPDATE TYPE_DAILY_COST
+            SET DAY_COST = DAY_COST + %s, CUM_COST = CUM_COST + %s
+            WHERE TYPE_ID = %s AND DAY = %s
+        """, [delta, delta, type_id, day])
+        return cursor.rowcount == 1
+
+    def rebuild(self):
+        """Az index teljes újraépítése az EXPENSES táblából."""
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM TYPE_DAILY_COST")
+                cursor.execute("""
+                    INSERT INTO TYPE_DAILY_COST (TYPE_ID, DAY, DAY_COST, CUM_COST)
+                    SELECT
+                        TYPE_ID,
+                        DATE_EXP,
+                        SUM(COST),
+                        SUM(SUM(COST)) OVER (PARTITION BY TYPE_ID ORDER BY DATE_EXP ROWS UNBOUNDED PRECEDING)
+                    FROM
+                        EXPENSES
+                    WHERE
+                        DATE_EXP IS NOT NULL AND COST IS NOT NULL
+                    GROUP BY
+                        TYPE_ID,
+                        DATE_EXP
+                """)
+                count = cursor.rowcount
+        return count
+
+
+def _recompute_from(type_id, day):
+    """
+    (sql, params): a type_id típus CUM_COST értékei a day naptól a DAY_COST futó összegéből,
+    az előző nap (zároló olvasással kiolvasott) kumulált összegére építve.
+    """
+    base = _cum_before('<', locking_read_hint())
+    if connection.vendor == 'microsoft':
+        return f"""
+            WITH suffix AS (
+                SELECT CUM_COST, SUM(DAY_COST) OVER (ORDER BY DAY ROWS UNBOUNDED PRECEDING) AS RUNNING
+                FROM TYPE_DAILY_COST
+                WHERE TYPE_ID = %s AND DAY >= %s
+            )
+            UPDATE suffix SET CUM_COST = RUNNING + {base}
+        """, [type_id, day, type_id, type_id, day]
+    return f"""
+        UPDATE TYPE_DAILY_COST
+        SET CUM_COST = s.RUNNING + {base}
+        FROM (
+            SELECT DAY, SUM(DAY_COST) OVER (ORDER BY DAY ROWS UNBOUNDED PRECEDING) AS RUNNING
+            FROM TYPE_DAILY_COST
+            WHERE TYPE_ID = %s AND DAY >= %s
+        ) s
+        WHERE TYPE_DAILY_COST.TYPE_ID = %s AND TYPE_DAILY_COST.DAY = s.DAY
+    """, [type_id, type_id, day, type_id, day, type_id]
+
+
+# Időszakok a hátralévő keret számításához: (kezdőnap, zárónap, a havi limit szorzója)
+def period_bounds(period, today=None):
+    today = today or date.today()
+    if period == 'week':
+        start = today - timedelta(days=today.weekday())
+        return start, start + timedelta(days=6), 7 * 12 / 365
+    if period == 'month':
+        start = today.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        return start, end, 1
+    if period == 'quarter':
+        start = date(today.year, 3 * ((today.month - 1) // 3) + 1, 1)
+        end = (start + timedelta(days=95)).replace(day=1) - timedelta(days=1)
+        return start, end, 3
+    if period == 'rolling30':
+        return today - timedelta(days=29), today, 1
+    raise ValueError(f"Unknown period: {period}")
+
+
+PERIODS = ('week', 'month', 'quarter', 'rolling30')
+
+cost_index = CumulativeCostIndex()
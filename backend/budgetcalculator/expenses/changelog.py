@@ -0,0 +1,115 @@
+# expenses/changelog.py
+# Változásnapló a delta szinkronizációhoz: minden író végpont felvesz egy sort
+# monoton növekvő CHANGE_NO sorszámmal, a kliensek ettől a ponttól kérdezik le a változásokat.
+from django.conf import settings
+from django.db import connection, transaction
+
+ENTITY_EXPENSE = 'expense'
+ENTITY_TYPE = 'type'
+
+
+def locking_read_hint():
+    """
+    SQL Serveren a CHANGE_NO az INSERT-kor kap értéket, nem a commitkor: egy már commitolt sor
+    sorszáma nagyobb lehet egy még futó tranzakcióénál. READ_COMMITTED_SNAPSHOT mellett (Azure SQL
+    alapértelmezés) az olvasó átlépné a futó tranzakció sorát és később sem látná. A READCOMMITTEDLOCK
+    tábla hint zároló read committed olvasást kényszerít, így az olvasó megvárja a futó írót.
+    """
+    return " WITH (READCOMMITTEDLOCK)" if connection.vendor == 'microsoft' else ""
+
+
+def record_change(entity, entity_id):
+    """Egy entitás módosulásának naplózása (a hívó tranzakciójában)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO CHANGE_LOG (ENTITY, ENTITY_ID, CHANGED_AT) VALUES (%s, %s, CURRENT_TIMESTAMP)",
+            [entity, entity_id]
+        )
+
+
+def record_changes(entity, entity_ids):
+    """Több entitás módosulásának naplózása egyetlen executemany-vel (a hívó tranzakciójában)."""
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            "INSERT INTO CHANGE_LOG (ENTITY, ENTITY_ID, CHANGED_AT) VALUES (%s, %s, CURRENT_TIMESTAMP)",
+            [(entity, entity_id) for entity_id in entity_ids]
+        )
+
+
+def compaction_floor():
+    """Az a sorszám, ameddig a napló tömörítve lett: ennél régebbi pontról nem lehet delta szinkronizálni."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT FLOOR_NO FROM CHANGE_LOG_STATE WHERE ID = 1")
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def high_water_mark():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT MAX(CHANGE_NO) FROM CHANGE_LOG")
+        row = cursor.fetchone()
+    return max(row[0] or 0, compaction_floor())
+
+
+def changes_since(since):
+    """
+    A since utáni változások entitásonként csoportosítva.
+    Visszatérési érték: (high_water_mark, {entity: set(entity_id)})
+    """
+    changed = {ENTITY_EXPENSE: set(), ENTITY_TYPE: set()}
+    high_water = since
+    with connection.cursor() as cursor:
+        # Zároló olvasás: a since utáni, még nem commitolt sorokat megvárjuk, nem lépünk át rajtuk
+        cursor.execute(f"""
+            SELECT CHANGE_NO, ENTITY, ENTITY_ID
+            FROM CHANGE_LOG{locking_read_hint()}
+            WHERE CHANGE_NO > %s
+            ORDER BY CHANGE_NO
+        """, [since])
+        for change_no, entity, entity_id in cursor.fetchall():
+            if entity in changed:
+                changed[entity].add(entity_id)
+            high_water = change_no
+    return high_water, changed
+
+
+def compact(max_entries=None):
+    """
+    A napló tömörítése: entitásonként csak a legutolsó bejegyzés marad, majd a
+    max_entries-nél régebbi bejegyzések törlődnek és a FLOOR_NO előrelép.
+    Visszatérési érték: (törölt sorok száma, új floor)
+    """
+    if max_entries is None:
+        max_entries = getattr(settings, 'CHANGE_LOG_MAX_ENTRIES', 10000)
+    max_entries = max(1, max_entries)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # Ugyanarra az entitásra vonatkozó régebbi bejegyzések feleslegesek
+            cursor.execute("""
+                DELETE FROM CHANGE_LOG
+                WHERE CHANGE_NO < (
+                    SELECT MAX(c.CHANGE_NO) FROM CHANGE_LOG c
+                    WHERE c.ENTITY = CHANGE_LOG.ENTITY AND c.ENTITY_ID = CHANGE_LOG.ENTITY_ID
+                )
+            """)
+            deleted = cursor.rowcount
+
+            floor = compaction_floor()
+            cursor.execute("SELECT COUNT(*) FROM CHANGE_LOG")
+            if cursor.fetchone()[0] > max_entries:
+                cursor.execute("""
+                    SELECT MIN(x.CHANGE_NO) FROM (
+                        SELECT CHANGE_NO, ROW_NUMBER() OVER (ORDER BY CHANGE_NO DESC) AS RN
+                        FROM CHANGE_LOG
+                    ) x
+                    WHERE x.RN <= %s
+                """, [max_entries])
+                cutoff = cursor.fetchone()[0]
+
+                cursor.execute("DELETE FROM CHANGE_LOG WHERE CHANGE_NO < %s", [cutoff])
+                deleted += cursor.rowcount
+                floor = max(floor, cutoff - 1)
+                cursor.execute("UPDATE CHANGE_LOG_STATE SET FLOOR_NO = %s WHERE ID = 1", [floor])
+
+    return deleted, floor
@@ -0,0 +1,9 @@
+# expenses/db_utils.py
+# SQL Server legfeljebb 2100 paramétert enged egy utasításban, ezért a nagy IN listákat daraboljuk.
+IN_CLAUSE_CHUNK_SIZE = 2000
+
+
+def in_chunks(values, size=IN_CLAUSE_CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
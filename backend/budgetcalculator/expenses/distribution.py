@@ -0,0 +1,376 @@
+# expenses/distribution.py
+# Típusonkénti eloszlás statisztikák (darabszám, összeg, medián, p90, top-N tételek).
+# Pontos mód: egyetlen ablakfüggvényes lekérdezés SQL Serveren, egy menetes Python számítás SQLite-on.
+# Közelítő mód: havonta és típusonként tárolt, összefésülhető logaritmikus hisztogram (DDSketch-szerű).
+import math
+from collections import defaultdict
+
+from django.db import IntegrityError, connection, transaction
+
+from .db_utils import in_chunks
+
+# A közelítő kvantilisek relatív hibája; a tárolt vödrök ettől függenek, ezért nem beállítás
+# (az sql/ szkriptek kezdeti feltöltése a log(gamma) értékét konstansként tartalmazza)
+SKETCH_RELATIVE_ACCURACY = 0.01
+_GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+GRANULARITY_MONTH = 'month'
+GRANULARITY_RANGE = 'range'
+GRANULARITIES = (GRANULARITY_MONTH, GRANULARITY_RANGE)
+
+
+def _month_of(value):
+    if isinstance(value, str):
+        return value[:7]
+    return f"{value.year}-{value.month:02d}"
+
+
+def percentile_cont(sorted_values, p):
+    """Lineáris interpoláció, mint az SQL Server PERCENTILE_CONT."""
+    if not sorted_values:
+        return None
+    rank = p * (len(sorted_values) - 1)
+    lower = math.floor(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+def _filters(date_from, date_to, type_ids):
+    where, params = ["e.DATE_EXP IS NOT NULL", "e.COST IS NOT NULL"], []
+    if date_from:
+        where.append("e.DATE_EXP >= %s")
+        params.append(date_from)
+    if date_to:
+        where.append("e.DATE_EXP <= %s")
+        params.append(date_to)
+    if type_ids:
+        where.append(f"e.TYPE_ID IN ({', '.join(['%s'] * len(type_ids))})")
+        params.extend(type_ids)
+    return " AND ".join(where), params
+
+
+def _sort_groups(groups):
+    # Hónap csökkenő, azon belül összeg csökkenő, egyezésnél típus ID szerint
+    groups.sort(key=lambda g: (g['typeId'],))
+    groups.sort(key=lambda g: (g['month'] or '', g['sumCost']), reverse=True)
+    return groups
+
+
+def _type_chunks(type_ids):
+    # A csoportok típusonként diszjunktak, így a darabolt lekérdezések eredményei egyszerűen összefűzhetők
+    return in_chunks(type_ids) if type_ids else [None]
+
+
+def exact_distribution(date_from=None, date_to=None, type_ids=None, top=3, granularity=GRANULARITY_MONTH):
+    run = _exact_mssql if connection.vendor == 'microsoft' else _exact_python
+    groups = []
+    for chunk in _type_chunks(type_ids):
+        groups.extend(run(date_from, date_to, chunk, top, granularity))
+    return _sort_groups(groups)
+
+
+def _exact_mssql(date_from, date_to, type_ids, top, granularity):
+    where, params = _filters(date_from, date_to, type_ids)
+    if granularity == GRANULARITY_MONTH:
+        month_expr = "CONVERT(CHAR(7), e.DATE_EXP, 120)"
+        partition = f"PARTITION BY {month_expr}, e.TYPE_ID"
+    else:
+        month_expr = "CAST(NULL AS CHAR(7))"
+        partition = "PARTITION BY e.TYPE_ID"
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT honap, TYPE_ID, TYPE_NAME, darab, osszkoltes, median, p90, ID, DATE_EXP, COST, COMMENT
+            FROM (
+                SELECT
+                    {month_expr} as honap,
+                    e.TYPE_ID,
+                    t.TYPE_NAME,
+                    e.ID,
+                    e.DATE_EXP,
+                    e.COST,
+                    e.COMMENT,
+                    COUNT(*) OVER ({partition}) as darab,
+                    SUM(e.COST) OVER ({partition}) as osszkoltes,
+                    PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY e.COST) OVER ({partition}) as median,
+                    PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY e.COST) OVER ({partition}) as p90,
+                    ROW_NUMBER() OVER ({partition} ORDER BY e.COST DESC, e.ID) as rn
+                FROM
+                    EXPENSES e
+                    JOIN TYPES t on e.TYPE_ID = t.ID
+                WHERE
+                    {where}
+            ) x
+            WHERE
+                rn <= %s OR rn = 1
+            ORDER BY
+                honap DESC,
+                osszkoltes DESC,
+                TYPE_ID,
+                rn
+        """, params + [top])
+        rows = cursor.fetchall()
+
+    groups = []
+    for honap, type_id, type_name, darab, osszkoltes, median, p90, exp_id, date_exp, cost, comment in rows:
+        if not groups or groups[-1]['month'] != honap or groups[-1]['typeId'] != type_id:
+            groups.append({
+                'month': honap,
+                'typeId': type_id,
+                'typeName': type_name,
+                'count': darab,
+                'sumCost': osszkoltes,
+                'median': median,
+                'p90': p90,
+                'approximate': False,
+                'top': []
+            })
+        if len(groups[-1]['top']) < top:
+            groups[-1]['top'].append({'id': exp_id, 'date': date_exp, 'cost': cost, 'descript': comment})
+    return groups
+
+
+def _exact_python(date_from, date_to, type_ids, top, granularity):
+    where, params = _filters(date_from, date_to, type_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT e.DATE_EXP, e.TYPE_ID, t.TYPE_NAME, e.ID, e.COST, e.COMMENT
+            FROM
+                EXPENSES e
+                JOIN TYPES t on e.TYPE_ID = t.ID
+            WHERE
+                {where}
+            ORDER BY
+                e.COST DESC,
+                e.ID
+        """, params)
+        rows = cursor.fetchall()
+
+    # Egy menet: a csökkenő költség szerinti sorrendből a csoportok listái is rendezettek
+    groups = {}
+    for date_exp, type_id, type_name, exp_id, cost, comment in rows:
+        month = _month_of(date_exp) if granularity == GRANULARITY_MONTH else None
+        group = groups.get((month, type_id))
+        if group is None:
+            group = groups[(month, type_id)] = {
+                'month': month, 'typeId': type_id, 'typeName': type_name, 'costs': [], 'top': []
+            }
+        group['costs'].append(cost)
+        if len(group['top']) < top:
+            group['top'].append({'id': exp_id, 'date': date_exp, 'cost': cost, 'descript': comment})
+
+    result = []
+    for group in groups.values():
+        costs = group.pop('costs')
+        costs.reverse()
+        group.update({
+            'count': len(costs),
+            'sumCost': sum(costs),
+            'median': percentile_cont(costs, 0.5),
+            'p90': percentile_cont(costs, 0.9),
+            'approximate': False
+        })
+        result.append(group)
+    return result
+
+
+class CostSketches:
+    """
+    Havonta és típusonként egy logaritmikus hisztogram a MONTHLY_COST_BUCKETS táblában:
+    soronként (hónap, típus, vödör) darabszám és összeg. A vödrök összeadhatók,
+    így tetszőleges hónap-tartomány kvantilisei a tárolt sorokból számolhatók.
+    """
+
+    # A költségek egész számok, így a pozitívak vödre >= 0; a nem pozitívak külön vödörbe kerülnek
+    ZERO_BUCKET = -1
+
+    @classmethod
+    def bucket_of(cls, cost):
+        if cost <= 0:
+            return cls.ZERO_BUCKET
+        return math.ceil(math.log(cost) / _LOG_GAMMA)
+
+    @classmethod
+    def bucket_value(cls, bucket):
+        if bucket == cls.ZERO_BUCKET:
+            return 0
+        return 2 * _GAMMA ** bucket / (_GAMMA + 1)
+
+    # --- Írás ---
+
+    def expense_changed(self, old=None, new=None):
+        """Mint CumulativeCostIndex.expense_changed: (type_id, date, cost) hármasok, a hívó tranzakciójában."""
+        for entry, sign in ((old, -1), (new, 1)):
+            if entry is None:
+                continue
+            type_id, day, cost = entry
+            if day is None or cost is None:
+                continue
+            self._add(_month_of(day), type_id, self.bucket_of(cost), sign, sign * cost)
+
+    def expenses_removed(self, rows):
+        """Több költés törlése egyszerre: (type_id, date, cost) hármasok, vödrönként összesítve."""
+        buckets = defaultdict(lambda: [0, 0])
+        for type_id, day, cost in rows:
+            if day is None or cost is None:
+                continue
+            entry = buckets[(_month_of(day), type_id, self.bucket_of(cost))]
+            entry[0] += 1
+            entry[1] += cost
+        if not buckets:
+            return
+        # A törölt költések vödrei léteznek, ezért elég csökkenteni és a kiürülteket törölni (két executemany)
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.executemany("""
+                    UPDATE MONTHLY_COST_BUCKETS
+                    SET CNT = CNT - %s, SUM_COST = SUM_COST - %s
+                    WHERE MONTH = %s AND TYPE_ID = %s AND BUCKET = %s
+                """, [(count, total) + key for key, (count, total) in buckets.items()])
+                cursor.executemany("""
+                    DELETE FROM MONTHLY_COST_BUCKETS
+                    WHERE MONTH = %s AND TYPE_ID = %s AND BUCKET = %s AND CNT = 0
+                """, list(buckets))
+
+    def _add(self, month, type_id, bucket, count, cost):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                if self._update(cursor, month, type_id, bucket, count, cost):
+                    cursor.execute("""
+                        DELETE FROM MONTHLY_COST_BUCKETS
+                        WHERE MONTH = %s AND TYPE_ID = %s AND BUCKET = %s AND CNT = 0
+                    """, [month, type_id, bucket])
+                    return
+                try:
+                    with transaction.atomic():
+                        cursor.execute("""
+                            INSERT INTO MONTHLY_COST_BUCKETS (MONTH, TYPE_ID, BUCKET, CNT, SUM_COST)
+                            VALUES (%s, %s, %s, %s, %s)
+                        """, [month, type_id, bucket, count, cost])
+                except IntegrityError:
+                    # Párhuzamos kérés közben beszúrta ugyanazt a vödröt
+                    self._update(cursor, month, type_id, bucket, count, cost)
+
+    @staticmethod
+    def _update(cursor, month, type_id, bucket, count, cost):
+        cursor.execute("""
+            UPDATE MONTHLY_COST_BUCKETS
+            SET CNT = CNT + %s, SUM_COST = SUM_COST + %s
+            WHERE MONTH = %s AND TYPE_ID = %s AND BUCKET = %s
+        """, [count, cost, month, type_id, bucket])
+        return cursor.rowcount == 1
+
+    def rebuild(self):
+        """
+        A hisztogramok újraépítése az EXPENSES táblából, egyetlen tranzakcióban (mint cost_index.rebuild):
+        a törlés és az INSERT ... SELECT között írt költés vagy a beolvasásban, vagy a saját
+        (a törlés zárjai miatt utána futó) frissítésében jelenik meg, de nem vész el.
+        A vödör képlete a bucket_of() és az sql/*.sql kezdeti feltöltésének megfelelője.
+        """
+        if connection.vendor == 'microsoft':
+            month_expr = "CONVERT(CHAR(7), DATE_EXP, 120)"
+            bucket_expr = f"CAST(CEILING(LOG(COST) / {_LOG_GAMMA!r}E0) AS INT)"
+            cost_expr = "CAST(COST AS BIGINT)"
+        else:
+            month_expr = "substr(DATE_EXP, 1, 7)"
+            bucket_expr = f"CAST(ceil(ln(COST) / {_LOG_GAMMA!r}) AS INTEGER)"
+            cost_expr = "COST"
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM MONTHLY_COST_BUCKETS")
+                cursor.execute(f"""
+                    INSERT INTO MONTHLY_COST_BUCKETS (MONTH, TYPE_ID, BUCKET, CNT, SUM_COST)
+                    SELECT MONTH, TYPE_ID, BUCKET, COUNT(*), SUM({cost_expr})
+                    FROM (
+                        SELECT
+                            {month_expr} AS MONTH,
+                            TYPE_ID,
+                            CASE WHEN COST > 0 THEN {bucket_expr} ELSE {self.ZERO_BUCKET} END AS BUCKET,
+                            COST
+                        FROM EXPENSES
+                        WHERE DATE_EXP IS NOT NULL AND COST IS NOT NULL
+                    ) x
+                    GROUP BY MONTH, TYPE_ID, BUCKET
+                """)
+                return cursor.rowcount
+
+    # --- Olvasás ---
+
+    def distribution(self, date_from=None, date_to=None, type_ids=None, granularity=GRANULARITY_MONTH):
+        """Közelítő statisztikák egész hónapokra (a from/to hónapja számít); top-N tételek nélkül."""
+        rows = []
+        for chunk in _type_chunks(type_ids):
+            rows.extend(self._bucket_rows(date_from, date_to, chunk))
+
+        # A hónapok vödrei összefésülhetők: tartomány esetén egyszerűen összeadjuk őket
+        groups = {}
+        for month, type_id, type_name, bucket, cnt, total in rows:
+            key = (month if granularity == GRANULARITY_MONTH else None, type_id)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {'month': key[0], 'typeId': type_id, 'typeName': type_name,
+                                       'count': 0, 'sumCost': 0, 'buckets': defaultdict(int)}
+            group['count'] += cnt
+            group['sumCost'] += total
+            group['buckets'][bucket] += cnt
+
+        result = []
+        for group in groups.values():
+            buckets = group.pop('buckets')
+            if group['count'] <= 0:
+                continue
+            group.update({
+                'median': self._quantile(buckets, group['count'], 0.5),
+                'p90': self._quantile(buckets, group['count'], 0.9),
+                'approximate': True,
+                'top': []
+            })
+            result.append(group)
+        return _sort_groups(result)
+
+    @staticmethod
+    def _bucket_rows(date_from, date_to, type_ids):
+        where, params = [], []
+        if date_from:
+            where.append("b.MONTH >= %s")
+            params.append(_month_of(date_from))
+        if date_to:
+            where.append("b.MONTH <= %s")
+            params.append(_month_of(date_to))
+        if type_ids:
+            where.append(f"b.TYPE_ID IN ({', '.join(['%s'] * len(type_ids))})")
+            params.extend(type_ids)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT b.MONTH, b.TYPE_ID, t.TYPE_NAME, b.BUCKET, b.CNT, b.SUM_COST
+                FROM
+                    MONTHLY_COST_BUCKETS b
+                    JOIN TYPES t on b.TYPE_ID = t.ID
+                {'WHERE ' + ' AND '.join(where) if where else ''}
+            """, params)
+            return cursor.fetchall()
+
+    def _quantile(self, buckets, count, p):
+        # Mint a PERCENTILE_CONT: a p * (n - 1) rangot közrefogó két elem között interpolálunk,
+        # az elemek értékét a vödrük reprezentáns értéke közelíti
+        ordered = sorted(buckets)
+        rank = p * (count - 1)
+        lower = math.floor(rank)
+        lower_value = self._value_at(ordered, buckets, lower)
+        upper_value = self._value_at(ordered, buckets, min(lower + 1, count - 1))
+        return lower_value + (upper_value - lower_value) * (rank - lower)
+
+    def _value_at(self, ordered, buckets, index):
+        # A növekvő sorrendben index-edik elem vödrének értéke
+        seen = 0
+        for bucket in ordered:
+            seen += buckets[bucket]
+            if seen > index:
+                return self.bucket_value(bucket)
+        return self.bucket_value(ordered[-1])
+
+
+cost_sketches = CostSketches()
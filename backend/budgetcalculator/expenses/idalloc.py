@@ -0,0 +1,134 @@
+# expenses/idalloc.py
+# Hi/lo ID kiosztás: a sequenciából blokkokat foglalunk le processzenként,
+# az ID-kat memóriából adjuk ki, így az INSERT-eknek nem kell a sequenciát érinteniük.
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+
+class IdBlockAllocator:
+    """
+    Egy sequence-hez tartozó ID blokk-foglaló.
+
+    SQL Serveren a sys.sp_sequence_get_range tárolt eljárással foglal le egy
+    tartományt, SQLite-on az ID_SEQUENCES számláló táblát lépteti.
+    Mielőtt a blokk elfogyna, háttérszálon lefoglalja a következőt (refill_ratio=0 esetén nem).
+    A foglalás mindig külön, autocommit kapcsolaton fut, így a kérés tranzakciójának
+    visszagörgetése nem adhatja vissza a már memóriában lévő blokkot.
+    """
+
+    def __init__(self, sequence_name, block_size=None, refill_ratio=None):
+        self.sequence_name = sequence_name
+        self._block_size = block_size
+        self._refill_ratio = refill_ratio
+        self._reset()
+        # Fork után (pl. gunicorn --preload) a gyerek nem használhatja a szülő blokkját
+        os.register_at_fork(after_in_child=self._reset)
+
+    @property
+    def block_size(self):
+        return self._block_size or getattr(settings, 'ID_BLOCK_SIZE', 50)
+
+    @property
+    def refill_ratio(self):
+        if self._refill_ratio is not None:
+            return self._refill_ratio
+        return getattr(settings, 'ID_BLOCK_REFILL_RATIO', 0.25)
+
+    def _reset(self):
+        self._next = 0
+        self._end = 0
+        self._spare = None
+        self._refilling = False
+        self._lock = threading.Lock()
+
+    def next_id(self):
+        return self.next_ids(1)[0]
+
+    def next_ids(self, count):
+        """count darab egyedi, növekvő ID kiosztása (batch INSERT-ekhez)."""
+        ids = []
+        with self._lock:
+            while len(ids) < count:
+                if self._next >= self._end:
+                    self._take_block()
+                take = min(count - len(ids), self._end - self._next)
+                ids.extend(range(self._next, self._next + take))
+                self._next += take
+
+            if (self.refill_ratio > 0 and not self._refilling and self._spare is None
+                    and self._end - self._next <= self.block_size * self.refill_ratio):
+                self._refilling = True
+                threading.Thread(target=self._refill, name=f'idalloc-{self.sequence_name}', daemon=True).start()
+        return ids
+
+    def _take_block(self):
+        # Lock alatt hívódik
+        if self._spare is not None:
+            self._next, self._end = self._spare
+            self._spare = None
+        else:
+            first = self._fetch_block()
+            self._next, self._end = first, first + self.block_size
+
+    def _fetch_block(self):
+        # Saját kapcsolat: a kérés kapcsolata egy atomic() blokkban lehet
+        conn = connections.create_connection(DEFAULT_DB_ALIAS)
+        try:
+            return fetch_range(conn, self.sequence_name, self.block_size)
+        finally:
+            conn.close()
+
+    def _refill(self):
+        try:
+            first = self._fetch_block()
+            with self._lock:
+                self._spare = (first, first + self.block_size)
+        except Exception as e:
+            # Nem végzetes: a következő kiosztás szinkron foglal
+            logger.error(f"Error refilling ID block for {self.sequence_name}: {str(e)}")
+        finally:
+            with self._lock:
+                self._refilling = False
+
+
+def fetch_range(conn, sequence_name, size):
+    """Lefoglal size darab egymást követő értéket, és visszaadja az elsőt. conn autocommit módban van."""
+    if conn.vendor == 'microsoft':
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SET NOCOUNT ON;
+                DECLARE @first sql_variant;
+                EXEC sys.sp_sequence_get_range
+                    @sequence_name = %s,
+                    @range_size = %s,
+                    @range_first_value = @first OUTPUT;
+                SELECT CAST(@first AS bigint);
+            """, [sequence_name, size])
+            return int(cursor.fetchone()[0])
+
+    if conn.vendor == 'sqlite':
+        # SQLite-on nincs sequence, az ID_SEQUENCES tábla emulálja (egy utasítás, tehát atomi)
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "UPDATE ID_SEQUENCES SET NEXT_VALUE = NEXT_VALUE + %s WHERE NAME = %s RETURNING NEXT_VALUE",
+                [size, sequence_name]
+            )
+            row = cursor.fetchone()
+            if row is None:
+                raise ImproperlyConfigured(f"Missing ID_SEQUENCES row for {sequence_name}")
+            return int(row[0]) - size
+
+    raise ImproperlyConfigured(f"ID block allocation is not supported on {conn.vendor}")
+
+
+expense_ids = IdBlockAllocator('SEQ_EXPENSES')
+# Típus ritkán jön létre: egyesével foglalunk, előfoglalás nélkül, hogy ne égessünk el ID-kat
+# (a pillanatkép TYPE_ID oszlopa int16)
+type_ids = IdBlockAllocator('SEQ_TYPE', block_size=1, refill_ratio=0)
@@ -0,0 +1,310 @@
+# expenses/jobs.py
+# Háttérben futó riport feladatok: a nehéz riportok nem a kérést kiszolgáló szálon futnak,
+# az állapotuk és eredményük a REPORT_JOBS táblában pollozható.
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connection, connections, transaction
+from django.utils import timezone
+
+from . import purge, report_workers
+from .budget_index import cost_index
+from .changelog import high_water_mark
+from .distribution import cost_sketches
+from .models import Expenses, ReportJobs
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+_thread_pool = None
+_process_pool = None
+_heartbeat_pid = None
+
+
+def _get_thread_pool():
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'JOBS_MAX_WORKERS', 2),
+            thread_name_prefix='report-job'
+        )
+    return _thread_pool
+
+
+def _get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        # spawn: a gyerek nem örökölheti a szülő nyitott adatbázis kapcsolatait
+        _process_pool = ProcessPoolExecutor(
+            max_workers=getattr(settings, 'JOBS_REPORT_PROCESSES', 4),
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=report_workers.init_process
+        )
+    return _process_pool
+
+
+def _reset_process_pool(pool):
+    global _process_pool
+    if _process_pool is pool:
+        _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+# --- Riportok ---
+
+def run_yearly_summary(params, progress):
+    year = params['year']
+    months = {}
+    pool = _get_process_pool()
+    futures = [pool.submit(report_workers.month_summary, year, month) for month in range(1, 13)]
+    try:
+        for done, future in enumerate(as_completed(futures), start=1):
+            rows = future.result()
+            if rows:
+                months[rows[0]['month']] = rows
+            progress(done * 100 // len(futures))
+    except BrokenProcessPool:
+        # A következő feladat új pool-t kap
+        _reset_process_pool(pool)
+        raise
+
+    # Az /koltesek/osszegzo sorrendje: hónap csökkenő, azon belül összeg csökkenő
+    return [row for month in sorted(months, reverse=True) for row in months[month]]
+
+
+def run_full_export(params, progress):
+    total = Expenses.objects.count()
+    rows = []
+    queryset = Expenses.objects.select_related('type_id').order_by('id')
+    for expense in queryset.iterator(chunk_size=2000):
+        rows.append({
+            'id': expense.id,
+            'date': expense.date_exp,
+            'typeId': expense.type_id.id,
+            'typeName': expense.type_id.type_name,
+            'cost': expense.cost,
+            'descript': expense.comment
+        })
+        if total and len(rows) % 2000 == 0:
+            progress(len(rows) * 100 // total)
+    return rows
+
+
+def run_analytics_recompute(params, progress):
+    cost_index_rows = cost_index.rebuild()
+    progress(50)
+    return {'costIndexRows': cost_index_rows, 'sketchBuckets': cost_sketches.rebuild()}
+
+
+def run_purge(params, progress):
+    deleted = purge.purge_expenses(
+        batch_size=params.get('batchSize'),
+        pause=params.get('pauseSeconds'),
+        progress=lambda done, total: progress(done * 100 // total if total else 100),
+        **purge.parse_filters(params)
+    )
+    return {'deleted': deleted}
+
+
+def validate_yearly_summary(params):
+    year = params.get('year')
+    if not isinstance(year, int) or not 1900 <= year <= 9999:
+        raise ValueError("params.year must be an integer year")
+    return {'year': year}
+
+
+def validate_no_params(params):
+    return {}
+
+
+def validate_purge(params):
+    # A szűrőket a purge végpont serializere már ellenőrizte
+    keys = ('dateFrom', 'dateTo', 'typeIds', 'idFrom', 'idTo', 'batchSize', 'pauseSeconds')
+    params = {key: params[key] for key in keys if params.get(key) is not None}
+    purge.parse_filters(params)
+    return params
+
+
+REPORTS = {
+    'yearly_summary': (validate_yearly_summary, run_yearly_summary),
+    'full_export': (validate_no_params, run_full_export),
+    'analytics_recompute': (validate_no_params, run_analytics_recompute),
+    # Csak a staff purge végponton keresztül indítható, a POST /jobs nem fogadja el
+    'purge': (validate_purge, run_purge),
+}
+
+# Ezek a feladatok nem riportok, hanem műveletek: az újraszámolás épp a változásnaplóban nem
+# látszó eltéréseket javítja, ezért a kész eredményük sosem hasznosítható újra
+NO_RESULT_REUSE = {'analytics_recompute', 'purge'}
+
+
+# --- Feladatkezelés ---
+
+def _params_key(kind, params):
+    canonical = json.dumps([kind, params], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _expire_abandoned():
+    """
+    A gazdátlanná vált (a futtató processz leállt) feladatok lezárása, hogy ne blokkolják a
+    deduplikációt: aminek a heartbeatje JOBS_STALE_SECONDS óta nem frissült, vagy amelyiknek
+    a gazda processze ezen a gépen már nem él.
+    """
+    now = timezone.now()
+    active = ReportJobs.objects.filter(status__in=[STATUS_QUEUED, STATUS_RUNNING])
+    stale_before = now - timedelta(seconds=getattr(settings, 'JOBS_STALE_SECONDS', 60))
+    abandoned = set(active.filter(heartbeat_at__lt=stale_before).values_list('id', flat=True))
+
+    for job_id, owner in active.filter(owner__startswith=socket.gethostname() + ':').values_list('id', 'owner'):
+        pid = owner.rpartition(':')[2]
+        if pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid)):
+            abandoned.add(job_id)
+
+    if abandoned:
+        ReportJobs.objects.filter(id__in=abandoned, status__in=[STATUS_QUEUED, STATUS_RUNNING]).update(
+            status=STATUS_FAILED, error='Abandoned', finished_at=now
+        )
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _heartbeat_loop(owner, pid):
+    interval = getattr(settings, 'JOBS_HEARTBEAT_SECONDS', 10)
+    while _heartbeat_pid == pid:
+        time.sleep(interval)
+        try:
+            ReportJobs.objects.filter(owner=owner, status__in=[STATUS_QUEUED, STATUS_RUNNING]).update(
+                heartbeat_at=timezone.now()
+            )
+        except Exception as e:
+            logger.error(f"Error in report job heartbeat: {str(e)}")
+        finally:
+            connection.close()
+
+
+def _ensure_heartbeat():
+    # Processzenként egy szál frissíti a saját várakozó és futó feladatok heartbeatjét (fork után újraindul)
+    global _heartbeat_pid
+    pid = os.getpid()
+    if _heartbeat_pid == pid:
+        return
+    _heartbeat_pid = pid
+    threading.Thread(target=_heartbeat_loop, args=(_owner(), pid), name='report-job-heartbeat', daemon=True).start()
+
+
+def _active_job(key):
+    return (ReportJobs.objects
+            .filter(params_key=key, status__in=[STATUS_QUEUED, STATUS_RUNNING])
+            .order_by('-id').first())
+
+
+def submit(kind, params):
+    """
+    Riport feladat indítása. Ha ugyanilyen feladat már fut vagy várakozik, azt adja vissza;
+    ha van kész eredmény, ami óta nem változtak az adatok (változásnapló), azt.
+    A deduplikációt processzek között is az UX_REPORT_JOBS_ACTIVE egyedi index garantálja.
+    Visszatérési érték: (job, created)
+    """
+    validate, _ = REPORTS[kind]
+    params = validate(params or {})
+    key = _params_key(kind, params)
+
+    _expire_abandoned()
+
+    running = _active_job(key)
+    if running:
+        return running, False
+
+    if kind not in NO_RESULT_REUSE:
+        cached = (ReportJobs.objects
+                  .filter(params_key=key, status=STATUS_DONE, data_version=high_water_mark())
+                  .order_by('-id').first())
+        if cached:
+            return cached, False
+
+    _ensure_heartbeat()
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            job = ReportJobs.objects.create(
+                kind=kind,
+                params=json.dumps(params),
+                params_key=key,
+                status=STATUS_QUEUED,
+                progress=0,
+                owner=_owner(),
+                heartbeat_at=now,
+                created_at=now
+            )
+    except IntegrityError:
+        # Egy másik kérés (akár másik worker) közben elindította ugyanezt a feladatot
+        running = _active_job(key)
+        if running:
+            return running, False
+        raise
+
+    _get_thread_pool().submit(_run, job.id)
+    return job, True
+
+
+def _run(job_id):
+    try:
+        job = ReportJobs.objects.get(id=job_id)
+        _, run = REPORTS[job.kind]
+
+        # A verziót az indulás előtt olvassuk: ha közben változnak az adatok, az eredmény nem lesz újrahasznosítva
+        job.data_version = high_water_mark()
+        job.status = STATUS_RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=['data_version', 'status', 'started_at'])
+
+        def progress(percent):
+            ReportJobs.objects.filter(id=job_id).update(progress=min(percent, 99))
+
+        try:
+            result = run(json.loads(job.params), progress)
+            ReportJobs.objects.filter(id=job_id).update(
+                status=STATUS_DONE,
+                progress=100,
+                result=json.dumps(result, cls=DjangoJSONEncoder),
+                finished_at=timezone.now()
+            )
+        except Exception as e:
+            logger.error(f"Error in report job {job_id} ({job.kind}): {str(e)}")
+            ReportJobs.objects.filter(id=job_id).update(
+                status=STATUS_FAILED,
+                error=str(e),
+                finished_at=timezone.now()
+            )
+    except Exception as e:
+        logger.error(f"Error starting report job {job_id}: {str(e)}")
+    finally:
+        connections.close_all()
@@ -0,0 +1,23 @@
+# expenses/management/commands/compact_changelog.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from expenses.changelog import compact
+
+
+class Command(BaseCommand):
+    help = (
+        "A változásnapló (CHANGE_LOG) tömörítése: entitásonként csak a legutolsó bejegyzés marad, "
+        "és legfeljebb --max-entries bejegyzés. A régebbi pontról szinkronizáló kliensek fullResync jelzést kapnak."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-entries', type=int,
+            default=getattr(settings, 'CHANGE_LOG_MAX_ENTRIES', 10000),
+            help="Megtartott bejegyzések maximális száma"
+        )
+
+    def handle(self, *args, **options):
+        deleted, floor = compact(options['max_entries'])
+        self.stdout.write(self.style.SUCCESS(f"Removed {deleted} change log entries, floor is now {floor}"))
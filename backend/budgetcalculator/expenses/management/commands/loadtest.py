@@ -0,0 +1,461 @@
+# expenses/management/commands/loadtest.py
+# Végponttól végpontig terjedő terheléses teszt vegyes olvasó/író terheléssel.
+import importlib.util
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Alapértelmezett terhelés: ~70% olvasás, ~25% rögzítés/módosítás, ~5% limit és típus
+DEFAULT_MIX = 'overview=30,overview_one=5,summary=30,types=5,create=20,update=5,limit=3,type=2'
+
+# A lokális teszt adatbázis alaptáblái (models.py nem kezeli őket); a kiegészítő táblák az sql/sqlite.sql-ből jönnek
+BASE_TABLES_SQL = """
+CREATE TABLE TYPES (
+    ID INTEGER PRIMARY KEY,
+    TYPE_NAME VARCHAR(50),
+    LIMIT_MONTH INTEGER
+);
+CREATE TABLE EXPENSES (
+    ID INTEGER PRIMARY KEY,
+    DATE_EXP DATE,
+    TYPE_ID INTEGER NOT NULL REFERENCES TYPES (ID),
+    COST INTEGER,
+    COMMENT VARCHAR(50)
+);
+"""
+
+# SQLite backend, ami az írásokat BEGIN IMMEDIATE-tel kezdi: a Django 4.2 alapértelmezett (deferred)
+# tranzakciói párhuzamos olvasás-majd-írás esetén azonnal "database is locked" hibát adnának
+SQLITE_BACKEND = """from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE")
+"""
+
+# Az elindított szerver beállításai: a projekt beállításai a lokális teszt adatbázissal
+SETTINGS_TEMPLATE = """from {base} import *  # noqa
+
+DATABASES = {{'default': {{'ENGINE': 'loadtest_sqlite', 'NAME': {db_path!r}, 'OPTIONS': {{'timeout': 30}}}}}}
+SNAPSHOT_DIR = {snapshot_dir!r}
+PROFILING_ENABLED = False
+"""
+
+# Ennyi saját típust hoz létre a teszt a feltöltéskor
+SEED_TYPES = 3
+
+
+class LoadTestState:
+    """
+    A futás közben megosztott azonosítók. Csak a teszt által létrehozott típusok és
+    költések kerülnek ide, így a módosító műveletek más adatot nem érintenek.
+    """
+
+    def __init__(self, type_ids, expense_ids):
+        self.lock = threading.Lock()
+        self.type_ids = list(type_ids)
+        self.expense_ids = list(expense_ids)
+
+    def random_type_id(self):
+        with self.lock:
+            return random.choice(self.type_ids)
+
+    def random_expense_id(self):
+        with self.lock:
+            return random.choice(self.expense_ids) if self.expense_ids else None
+
+    def add_expense(self, expense_id):
+        with self.lock:
+            self.expense_ids.append(expense_id)
+
+    def add_type(self, type_id):
+        with self.lock:
+            self.type_ids.append(type_id)
+
+
+def _random_date():
+    return (date.today() - timedelta(days=random.randint(0, 730))).isoformat()
+
+
+def _expense_payload(state):
+    return {
+        'datum': _random_date(),
+        'typeId': state.random_type_id(),
+        'osszeg': random.randint(100, 50000),
+        'leiras': 'loadtest',
+    }
+
+
+# Minden művelet: (metódus, útvonal, törzs) előállítása és a válasz feldolgozása
+def op_overview(state):
+    return 'GET', '/koltesek/attekinto', None, None
+
+
+def op_overview_one(state):
+    expense_id = state.random_expense_id()
+    return 'GET', f'/koltesek/attekinto?expensesId={expense_id}', None, None
+
+
+def op_summary(state):
+    return 'GET', '/koltesek/osszegzo', None, None
+
+
+def op_types(state):
+    return 'GET', '/koltesek/limit_kiir', None, None
+
+
+def op_create(state):
+    return 'POST', '/koltesek', _expense_payload(state), lambda body: state.add_expense(body['id'])
+
+
+def op_update(state):
+    expense_id = state.random_expense_id()
+    payload = {
+        'date': _random_date(),
+        'typeId': state.random_type_id(),
+        'cost': random.randint(100, 50000),
+        'description': 'loadtest',
+    }
+    return 'PUT', f'/expenses/{expense_id}', payload, None
+
+
+def op_limit(state):
+    type_id = state.random_type_id()
+    return 'PUT', f'/koltesek/limitmod/{type_id}?limitMonth={random.randint(10000, 500000)}', None, None
+
+
+def op_type(state):
+    payload = {'typeName': f'lt-{random.randint(0, 10 ** 8)}', 'limitMonth': random.randint(10000, 500000)}
+    return 'POST', '/expensetype', payload, lambda body: state.add_type(body['typeId'])
+
+
+OPERATIONS = {
+    'overview': op_overview,
+    'overview_one': op_overview_one,
+    'summary': op_summary,
+    'types': op_types,
+    'create': op_create,
+    'update': op_update,
+    'limit': op_limit,
+    'type': op_type,
+}
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise CommandError(f"Unknown operation in --mix: {name}")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise CommandError(f"Invalid weight for {name}: {weight}")
+    if not mix or sum(mix.values()) <= 0:
+        raise CommandError("--mix must contain at least one positive weight")
+    return mix
+
+
+def parse_int_list(value, option):
+    try:
+        values = [int(v) for v in value.split(',') if v.strip()]
+    except ValueError:
+        raise CommandError(f"{option} must be a comma separated list of integers")
+    if not values or min(values) < 1:
+        raise CommandError(f"{option} values must be positive")
+    return values
+
+
+def percentile(sorted_values, p):
+    # Nearest-rank percentilis
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+class Client:
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, payload=None):
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            req.add_header('Content-Type', 'application/json')
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+class Command(BaseCommand):
+    help = (
+        "Vegyes olvasó/író terheléses teszt az expenses végpontjaira. Elindít egy lokális "
+        "szervert (gunicorn, ha telepítve van, különben runserver; több workerhez gunicorn kell) "
+        "egy ideiglenes, feltöltött SQLite adatbázissal és pillanatképpel, és konkurencia- illetve worker-szám sorozatokra méri az "
+        "áteresztőképességet, a p50/p95/p99 késleltetést és a hibaarányt végpontonként. "
+        "--url esetén a megadott szerver adatbázisába ír, és a teszt adatok ott maradnak."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Már futó szerver címe; ha meg van adva, nem indít szervert, "
+                                          "és a teszt adatokat annak adatbázisába írja")
+        parser.add_argument('--port', type=int, default=8765, help="Az elindított szerver portja")
+        parser.add_argument('--workers', default='1', help="Worker számok vesszővel, pl. 1,2,4")
+        parser.add_argument('--concurrency', default='1,4,16', help="Konkurencia szintek vesszővel")
+        parser.add_argument('--duration', type=float, default=20.0, help="Egy mérés hossza másodpercben")
+        parser.add_argument('--warmup', type=float, default=2.0, help="Bemelegítés másodpercben (nem mért)")
+        parser.add_argument('--mix', default=DEFAULT_MIX, help="Műveletek súlyai, pl. overview=70,create=30")
+        parser.add_argument('--seed', type=int, default=200, help="Ennyi költést rögzít mérés előtt")
+        parser.add_argument('--timeout', type=float, default=30.0, help="Kérés timeout másodpercben")
+        parser.add_argument('--json', dest='json_path', help="Eredmények mentése JSON fájlba")
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options['mix'])
+        workers_list = parse_int_list(options['workers'], '--workers')
+        concurrency_list = parse_int_list(options['concurrency'], '--concurrency')
+
+        if options['url'] and workers_list != [1]:
+            self.stderr.write("--workers is ignored when --url is given")
+            workers_list = [1]
+        if not options['url'] and max(workers_list) > 1 and importlib.util.find_spec('gunicorn') is None:
+            raise CommandError("--workers greater than 1 requires gunicorn (pip install -r requirements.txt)")
+
+        if options['url']:
+            self.stderr.write(f"Load test data is written to the database behind {options['url']} and not removed")
+            work_dir = None
+        else:
+            work_dir = tempfile.mkdtemp(prefix='loadtest-')
+
+        results = []
+        try:
+            for workers in workers_list:
+                self._measure(workers, concurrency_list, mix, options, work_dir, results)
+        finally:
+            if work_dir is not None:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['json_path']}")
+
+    def _measure(self, workers, concurrency_list, mix, options, work_dir, results):
+        server = None
+        env = None
+        base_url = options['url']
+        if not base_url:
+            env = self._server_env(work_dir, workers)
+            server = self._start_server(workers, options['port'], env)
+            base_url = f"http://127.0.0.1:{options['port']}"
+        try:
+            client = Client(base_url, options['timeout'])
+            self._wait_ready(client, server)
+            state = self._seed(client, options['seed'])
+            if env is not None:
+                self._build_snapshot(env)
+            for concurrency in concurrency_list:
+                if options['warmup'] > 0:
+                    self._run(client, state, mix, concurrency, options['warmup'])
+                samples, elapsed = self._run(client, state, mix, concurrency, options['duration'])
+                report = self._report(samples, elapsed)
+                results.append({'workers': workers, 'concurrency': concurrency, 'endpoints': report})
+                self._print_report(workers, concurrency, report)
+        finally:
+            if server is not None:
+                self._stop_server(server)
+
+    def _create_database(self, work_dir, workers):
+        """Friss SQLite adatbázis az alaptáblákkal és az sql/sqlite.sql kiegészítő tábláival."""
+        db_path = os.path.join(work_dir, f'loadtest_w{workers}.sqlite3')
+        with open(os.path.join(settings.BASE_DIR, 'sql', 'sqlite.sql'), encoding='utf-8') as f:
+            extra_tables_sql = f.read()
+        db = sqlite3.connect(db_path)
+        try:
+            db.executescript(BASE_TABLES_SQL)
+            db.executescript(extra_tables_sql)
+            db.commit()
+        finally:
+            db.close()
+        return db_path
+
+    def _write_settings(self, work_dir, workers, db_path):
+        backend_dir = os.path.join(work_dir, 'loadtest_sqlite')
+        os.makedirs(backend_dir, exist_ok=True)
+        open(os.path.join(backend_dir, '__init__.py'), 'w').close()
+        with open(os.path.join(backend_dir, 'base.py'), 'w', encoding='utf-8') as f:
+            f.write(SQLITE_BACKEND)
+
+        module = f'loadtest_settings_w{workers}'
+        with open(os.path.join(work_dir, module + '.py'), 'w', encoding='utf-8') as f:
+            f.write(SETTINGS_TEMPLATE.format(
+                base=settings.SETTINGS_MODULE,
+                db_path=db_path,
+                snapshot_dir=os.path.join(work_dir, f'snapshots_w{workers}'),
+            ))
+        return module
+
+    def _server_env(self, work_dir, workers):
+        # A szerver mindig a lokális teszt adatbázist kapja, sosem a beállított adatbázist
+        db_path = self._create_database(work_dir, workers)
+        env = os.environ.copy()
+        env['DJANGO_SETTINGS_MODULE'] = self._write_settings(work_dir, workers, db_path)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [work_dir, str(settings.BASE_DIR), env.get('PYTHONPATH')]))
+        self.stdout.write(f"Using load test database {db_path}")
+        return env
+
+    def _build_snapshot(self, env):
+        # Élesben az összesítő a (cronból frissített) pillanatképből szolgál ki, így a mérés is azt az utat méri
+        completed = subprocess.run([sys.executable, 'manage.py', 'build_snapshot'], cwd=str(settings.BASE_DIR),
+                                   env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if completed.returncode != 0:
+            raise CommandError(f"build_snapshot failed: {completed.stderr.decode('utf-8', 'replace')[-500:]}")
+
+    def _start_server(self, workers, port, env):
+        # Egy már futó (akár éles adatbázison dolgozó) szervert nem terhelünk és nem töltünk fel
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            if sock.connect_ex(('127.0.0.1', port)) == 0:
+                raise CommandError(f"Port {port} is already in use; use --url to load test a running server")
+
+        if importlib.util.find_spec('gunicorn') is not None:
+            cmd = [sys.executable, '-m', 'gunicorn', 'budgetcalculator.wsgi:application',
+                   '--workers', str(workers), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning']
+        else:
+            cmd = [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}', '--noreload']
+
+        self.stdout.write(f"Starting server: {' '.join(cmd[1:])}")
+        return subprocess.Popen(cmd, cwd=str(settings.BASE_DIR), env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def _stop_server(self, server):
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    def _wait_ready(self, client, server=None, timeout=30.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server is not None and server.poll() is not None:
+                raise CommandError(f"Server exited with code {server.returncode} before becoming ready")
+            try:
+                status_code, _ = client.request('GET', '/koltesek/limit_kiir')
+                if status_code == 200:
+                    return
+            except (urllib.error.URLError, socket.error):
+                pass
+            time.sleep(0.25)
+        raise CommandError(f"Server at {client.base_url} did not become ready")
+
+    def _seed(self, client, count):
+        # Saját típusok: a limit és költés módosítások csak ezeket és a saját költéseket érintik
+        type_ids = []
+        for _ in range(SEED_TYPES):
+            payload = {'typeName': f'lt-seed-{random.randint(0, 10 ** 8)}', 'limitMonth': 100000}
+            status_code, body = client.request('POST', '/expensetype', payload)
+            if status_code != 201:
+                raise CommandError(f"Could not create seed type: {status_code} {body[:200]}")
+            type_ids.append(json.loads(body)['typeId'])
+
+        state = LoadTestState(type_ids, [])
+        for _ in range(count):
+            status_code, body = client.request('POST', '/koltesek', _expense_payload(state))
+            if status_code != 200:
+                raise CommandError(f"Seeding failed: {status_code} {body[:200]}")
+            state.add_expense(json.loads(body)['id'])
+
+        if not state.expense_ids:
+            # Legalább egy költés kell a módosító és egyedi lekérdező műveletekhez
+            status_code, body = client.request('POST', '/koltesek', _expense_payload(state))
+            if status_code == 200:
+                state.add_expense(json.loads(body)['id'])
+
+        self.stdout.write(f"Seeded {len(state.expense_ids)} expenses and {len(state.type_ids)} types")
+        return state
+
+    def _run(self, client, state, mix, concurrency, duration):
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        samples = []
+        samples_lock = threading.Lock()
+        deadline = time.monotonic() + duration
+
+        def worker():
+            local = []
+            while time.monotonic() < deadline:
+                name = random.choices(names, weights)[0]
+                method, path, payload, on_success = OPERATIONS[name](state)
+                start = time.perf_counter()
+                try:
+                    status_code, body = client.request(method, path, payload)
+                    ok = 200 <= status_code < 300
+                except (urllib.error.URLError, socket.error):
+                    status_code, body, ok = None, b'', False
+                latency = time.perf_counter() - start
+                if ok and on_success is not None:
+                    try:
+                        on_success(json.loads(body))
+                    except (ValueError, KeyError):
+                        pass
+                local.append((name, latency, ok))
+            with samples_lock:
+                samples.extend(local)
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for _ in range(concurrency):
+                executor.submit(worker)
+        return samples, time.monotonic() - started
+
+    def _report(self, samples, elapsed):
+        by_endpoint = defaultdict(list)
+        for name, latency, ok in samples:
+            by_endpoint[name].append((latency, ok))
+            by_endpoint['ALL'].append((latency, ok))
+
+        report = {}
+        for name, items in by_endpoint.items():
+            latencies = sorted(latency for latency, _ in items)
+            errors = sum(1 for _, ok in items if not ok)
+            report[name] = {
+                'requests': len(items),
+                'throughput': round(len(items) / elapsed, 2) if elapsed else 0,
+                'p50Ms': round(percentile(latencies, 50) * 1000, 2),
+                'p95Ms': round(percentile(latencies, 95) * 1000, 2),
+                'p99Ms': round(percentile(latencies, 99) * 1000, 2),
+                'errorRate': round(errors / len(items), 4),
+            }
+        return report
+
+    def _print_report(self, workers, concurrency, report):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\nworkers={workers} concurrency={concurrency}"))
+        self.stdout.write(f"{'endpoint':<14}{'req':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'err %':>8}")
+        for name in sorted(report, key=lambda n: (n == 'ALL', n)):
+            r = report[name]
+            self.stdout.write(
+                f"{name:<14}{r['requests']:>8}{r['throughput']:>10}{r['p50Ms']:>10}"
+                f"{r['p95Ms']:>10}{r['p99Ms']:>10}{r['errorRate'] * 100:>8.2f}"
+            )
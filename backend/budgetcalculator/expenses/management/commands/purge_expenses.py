@@ -0,0 +1,59 @@
+# expenses/management/commands/purge_expenses.py
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.purge import MAX_BATCH_SIZE, count_expenses, purge_expenses
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date (expected YYYY-MM-DD): {value}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Költések törlése dátum tartomány, típus vagy ID tartomány szerint, "
+        "kis kötegekben és rövid tranzakciókkal. A kumulált index, a havi hisztogramok és a "
+        "változásnapló a törléssel együtt frissül."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=_date, help="Időszak kezdete (YYYY-MM-DD)")
+        parser.add_argument('--to', dest='date_to', type=_date, help="Időszak vége (YYYY-MM-DD, zárt)")
+        parser.add_argument('--type', dest='type_ids', type=int, action='append', help="Típus ID (többször megadható)")
+        parser.add_argument('--id-from', type=int, help="Legkisebb törlendő költés ID (zárt)")
+        parser.add_argument('--id-to', type=int, help="Legnagyobb törlendő költés ID (zárt)")
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'PURGE_BATCH_SIZE', 500),
+                            help=f"Kötegméret (legfeljebb {MAX_BATCH_SIZE})")
+        parser.add_argument('--pause', type=float, default=getattr(settings, 'PURGE_PAUSE_SECONDS', 0.1),
+                            help="Várakozás két köteg között másodpercben")
+        parser.add_argument('--dry-run', action='store_true', help="Csak a törlendő sorok számát írja ki")
+
+    def handle(self, *args, **options):
+        filters = {
+            'date_from': options['date_from'],
+            'date_to': options['date_to'],
+            'type_ids': options['type_ids'],
+            'id_from': options['id_from'],
+            'id_to': options['id_to'],
+        }
+        try:
+            if options['dry_run']:
+                count = count_expenses(**filters)
+                self.stdout.write(f"{count} expenses would be deleted")
+                return
+
+            deleted = purge_expenses(
+                batch_size=options['batch_size'],
+                pause=options['pause'],
+                progress=lambda done, total: self.stdout.write(f"Deleted {done}/{total}"),
+                **filters
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expenses"))
@@ -0,0 +1,12 @@
+# expenses/management/commands/rebuild_cost_index.py
+from django.core.management.base import BaseCommand
+
+from expenses.budget_index import cost_index
+
+
+class Command(BaseCommand):
+    help = "A típusonkénti kumulált napi költés index (TYPE_DAILY_COST) újraépítése az EXPENSES táblából."
+
+    def handle(self, *args, **options):
+        count = cost_index.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt TYPE_DAILY_COST with {count} rows"))
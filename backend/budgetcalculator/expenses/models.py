@@ -28,4 +28,28 @@ class Expenses(models.Model):
         ordering = ['-date_exp']
         
     def __str__(self):
-        return f"{self.cost} - {self.type_id.type_name} - {self.date_exp}"
\ No newline at end of file
+        return f"{self.cost} - {self.type_id.type_name} - {self.date_exp}"
+
+class ReportJobs(models.Model):
+    # Háttérben futó riport feladatok (expenses/jobs.py)
+    id = models.AutoField(primary_key=True)
+    kind = models.CharField(max_length=30)
+    params = models.TextField()
+    params_key = models.CharField(max_length=64)
+    status = models.CharField(max_length=10)
+    progress = models.IntegerField(default=0)
+    data_version = models.BigIntegerField(null=True, blank=True)
+    result = models.TextField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    owner = models.CharField(max_length=100, null=True, blank=True)  # host:pid, aki futtatja
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'REPORT_JOBS'
+        managed = False  # A táblát az sql/ szkriptek hozzák létre
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
@@ -0,0 +1,216 @@
+# expenses/profiling.py
+# Igény szerinti kérés-profilozás: egy-egy lassú éles kérés kivizsgálásához.
+import cProfile
+import hmac
+import json
+import os
+import re
+import time
+import traceback
+import uuid
+from contextlib import ExitStack
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import FileResponse, Http404
+from django.shortcuts import render
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_TOKEN_HEADER = 'HTTP_X_PROFILE_TOKEN'
+PROFILE_QUERY_PARAM = '_profile'
+
+# Az artefaktumok neve: <időbélyeg>-<rövid uuid>
+_ARTIFACT_NAME_RE = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$')
+_ARTIFACT_KINDS = {
+    'pstats': ('.pstats', 'application/octet-stream'),
+    'sql': ('.json', 'application/json'),
+}
+
+
+def _profile_dir():
+    return str(getattr(settings, 'PROFILE_DIR', os.path.join(settings.BASE_DIR, 'profiles')))
+
+
+class SqlRecorder:
+    """
+    connection.execute_wrapper-ként minden SQL utasítást rögzít
+    futásidővel és a projekten belüli hívási hellyel együtt.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries.append({
+                'db': self.alias,
+                'sql': sql,
+                'params': repr(params),
+                'many': many,
+                'durationMs': round(duration * 1000, 3),
+                'stack': self._call_site(),
+            })
+
+    @staticmethod
+    def _call_site():
+        # Csak a saját kódunk frame-jei érdekesek, a Django/DRF belsők nem
+        base_dir = str(settings.BASE_DIR)
+        frames = []
+        for frame in traceback.extract_stack()[:-2]:
+            if (frame.filename.startswith(base_dir) and frame.filename != __file__
+                    and 'site-packages' not in frame.filename):
+                frames.append(f"{os.path.relpath(frame.filename, base_dir)}:{frame.lineno} in {frame.name}")
+        return frames
+
+
+class RequestProfilingMiddleware:
+    """
+    Egy kérést cProfile alatt futtat és rögzíti az SQL utasításait, ha a kérés
+    X-Profile: 1 fejlécet vagy ?_profile=1 paramétert hordoz.
+
+    Csak staff felhasználónak vagy érvényes X-Profile-Token fejlécnek engedélyezett.
+    Ha PROFILING_ENABLED ki van kapcsolva, a middleware be sem töltődik,
+    így nincs semmilyen többletköltség.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self._is_requested(request) or not self._is_allowed(request):
+            return self.get_response(request)
+        return self._profile(request)
+
+    @staticmethod
+    def _is_requested(request):
+        return (request.META.get(PROFILE_HEADER) == '1'
+                or request.GET.get(PROFILE_QUERY_PARAM) == '1')
+
+    @staticmethod
+    def _is_allowed(request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_active and user.is_staff:
+            return True
+        token = getattr(settings, 'PROFILE_TOKEN', '')
+        supplied = request.META.get(PROFILE_TOKEN_HEADER, '')
+        # Bájtként hasonlítunk: a compare_digest nem-ASCII str esetén TypeError-t dob
+        return bool(token) and hmac.compare_digest(token.encode('utf-8'), supplied.encode('utf-8', 'surrogateescape'))
+
+    def _profile(self, request):
+        recorders = [SqlRecorder(alias) for alias in connections]
+        profiler = cProfile.Profile()
+        started_at = datetime.now()
+        start = time.perf_counter()
+
+        with ExitStack() as stack:
+            for recorder in recorders:
+                stack.enter_context(connections[recorder.alias].execute_wrapper(recorder))
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+
+        duration = time.perf_counter() - start
+        queries = [query for recorder in recorders for query in recorder.queries]
+        name = f"{started_at:%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+        os.makedirs(_profile_dir(), exist_ok=True)
+        profiler.dump_stats(os.path.join(_profile_dir(), name + '.pstats'))
+        with open(os.path.join(_profile_dir(), name + '.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'name': name,
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                'startedAt': started_at.isoformat(),
+                'durationMs': round(duration * 1000, 3),
+                'queryCount': len(queries),
+                'queryTimeMs': round(sum(q['durationMs'] for q in queries), 3),
+                'queries': queries,
+            }, f, ensure_ascii=False, indent=2)
+
+        _prune_artifacts(keep=name)
+        response['X-Profile-Id'] = name
+        return response
+
+
+def _prune_artifacts(keep):
+    # Csak a legutóbbi PROFILE_MAX_ARTIFACTS profil marad meg (módosítási idő szerint)
+    max_artifacts = max(1, getattr(settings, 'PROFILE_MAX_ARTIFACTS', 200))
+    profile_dir = _profile_dir()
+    profiles = []
+    for filename in os.listdir(profile_dir):
+        name, ext = os.path.splitext(filename)
+        if ext == '.json' and name != keep and _ARTIFACT_NAME_RE.match(name):
+            try:
+                profiles.append((os.path.getmtime(os.path.join(profile_dir, filename)), name))
+            except FileNotFoundError:
+                continue
+    profiles.sort()
+    for _, name in profiles[:len(profiles) - (max_artifacts - 1)]:
+        for ext, _ in _ARTIFACT_KINDS.values():
+            try:
+                os.remove(os.path.join(profile_dir, name + ext))
+            except FileNotFoundError:
+                pass
+
+
+def _load_artifacts():
+    profile_dir = _profile_dir()
+    if not os.path.isdir(profile_dir):
+        return []
+
+    artifacts = []
+    for filename in sorted(os.listdir(profile_dir), reverse=True):
+        name, ext = os.path.splitext(filename)
+        if ext != '.json' or not _ARTIFACT_NAME_RE.match(name):
+            continue
+        try:
+            with open(os.path.join(profile_dir, filename), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        meta.pop('queries', None)
+        artifacts.append(meta)
+    return artifacts
+
+
+@staff_member_required
+def profile_list(request):
+    """
+    GET /admin/profiles/
+    A rögzített profilok listája letöltési linkekkel.
+    """
+    return render(request, 'admin/expenses/profiles.html', {
+        'title': 'Kérés profilok',
+        'artifacts': _load_artifacts(),
+    })
+
+
+@staff_member_required
+def profile_download(request, name, kind):
+    """
+    GET /admin/profiles/<name>/<kind>
+    Egy profil letöltése (pstats vagy az SQL utasítások JSON-ja).
+    """
+    if kind not in _ARTIFACT_KINDS or not _ARTIFACT_NAME_RE.match(name):
+        raise Http404("Profile not found")
+
+    ext, content_type = _ARTIFACT_KINDS[kind]
+    path = os.path.join(_profile_dir(), name + ext)
+    if not os.path.isfile(path):
+        raise Http404("Profile not found")
+
+    return FileResponse(open(path, 'rb'), as_attachment=True,
+                        filename=name + ext, content_type=content_type)
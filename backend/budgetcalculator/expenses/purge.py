@@ -0,0 +1,131 @@
+# expenses/purge.py
+# Költések törlése szűrők alapján kis, kulcs szerint rendezett kötegekben, rövid tranzakciókkal,
+# hogy SQL Serveren ne eszkalálódjon táblazárrá és ne blokkolja a párhuzamos rögzítéseket.
+import time
+from datetime import date
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .budget_index import cost_index
+from .changelog import ENTITY_EXPENSE, record_changes
+from .distribution import cost_sketches
+
+# SQL Server 5000 zár felett eszkalál, ezért a köteg ennél jóval kisebb
+MAX_BATCH_SIZE = 2000
+
+
+def _filters(date_from, date_to, type_ids, id_from, id_to):
+    where, params = [], []
+    if date_from:
+        where.append("DATE_EXP >= %s")
+        params.append(date_from)
+    if date_to:
+        where.append("DATE_EXP <= %s")
+        params.append(date_to)
+    if type_ids:
+        where.append(f"TYPE_ID IN ({', '.join(['%s'] * len(type_ids))})")
+        params.extend(type_ids)
+    if id_from is not None:
+        where.append("ID >= %s")
+        params.append(id_from)
+    if id_to is not None:
+        where.append("ID <= %s")
+        params.append(id_to)
+    if not where:
+        raise ValueError("At least one filter (date range, type or ID range) is required")
+    return where, params
+
+
+def count_expenses(date_from=None, date_to=None, type_ids=None, id_from=None, id_to=None):
+    """A szűrőknek megfelelő költések száma (dry run)."""
+    where, params = _filters(date_from, date_to, type_ids, id_from, id_to)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM EXPENSES WHERE {' AND '.join(where)}", params)
+        return cursor.fetchone()[0]
+
+
+def purge_expenses(date_from=None, date_to=None, type_ids=None, id_from=None, id_to=None,
+                   batch_size=None, pause=None, progress=None):
+    """
+    A szűrőknek megfelelő költések törlése ID szerint növekvő kötegekben.
+
+    Kötegenként egy rövid tranzakció: a sorok törlése (a törölt értékeket maga a DELETE adja
+    vissza, így egy párhuzamos módosítás nem csúszhat be), a kumulált index (típusonként egy
+    újraszámolás) és a havi hisztogramok csökkentése, valamint a változásnapló bejegyzései (ezen
+    keresztül a delta szinkronizáció, a pillanatkép overlay és a riport gyorsítótár is értesül).
+    Két köteg között pause másodpercet vár. progress(törölt, összes) minden köteg után hívódik.
+    Visszatérési érték: a törölt sorok száma.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'PURGE_BATCH_SIZE', 500)
+    if pause is None:
+        pause = getattr(settings, 'PURGE_PAUSE_SECONDS', 0.1)
+    batch_size = int(batch_size)
+    if not 1 <= batch_size <= MAX_BATCH_SIZE:
+        raise ValueError(f"batch_size must be between 1 and {MAX_BATCH_SIZE}")
+
+    where, params = _filters(date_from, date_to, type_ids, id_from, id_to)
+    total = count_expenses(date_from, date_to, type_ids, id_from, id_to)
+    # A kötegek a törlő utasítás által visszaadott (törölt) értékekkel frissítik az indexeket, így
+    # egy közben lefutott módosítás régi értékei sosem kerülnek levonásra
+    if connection.vendor == 'microsoft':
+        delete = f"""
+            WITH batch AS (
+                SELECT TOP ({batch_size}) ID, TYPE_ID, DATE_EXP, COST
+                FROM EXPENSES
+                WHERE {{}}
+                ORDER BY ID
+            )
+            DELETE FROM batch
+            OUTPUT DELETED.ID, DELETED.TYPE_ID, DELETED.DATE_EXP, DELETED.COST
+        """
+    else:
+        delete = f"""
+            DELETE FROM EXPENSES
+            WHERE ID IN (
+                SELECT ID FROM EXPENSES WHERE {{}} ORDER BY ID LIMIT {batch_size}
+            )
+            RETURNING ID, TYPE_ID, DATE_EXP, COST
+        """  # SQLite 3.35+
+
+    deleted = 0
+    last_id = None
+    while True:
+        batch_where = where + (["ID > %s"] if last_id is not None else [])
+        batch_params = params + ([last_id] if last_id is not None else [])
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(delete.format(' AND '.join(batch_where)), batch_params)
+                rows = cursor.fetchall()
+            if not rows:
+                break
+
+            ids = sorted(row[0] for row in rows)
+            removed = [(type_id, date_exp, cost) for _, type_id, date_exp, cost in rows]
+            cost_index.expenses_removed(removed)
+            cost_sketches.expenses_removed(removed)
+            record_changes(ENTITY_EXPENSE, ids)
+
+        deleted += len(ids)
+        last_id = ids[-1]
+        if progress:
+            progress(deleted, total)
+        if len(rows) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    return deleted
+
+
+def parse_filters(params):
+    """A JSON-ban tárolt szűrők (riport feladat paraméterei) visszaalakítása."""
+    return {
+        'date_from': date.fromisoformat(params['dateFrom']) if params.get('dateFrom') else None,
+        'date_to': date.fromisoformat(params['dateTo']) if params.get('dateTo') else None,
+        'type_ids': params.get('typeIds') or None,
+        'id_from': params.get('idFrom'),
+        'id_to': params.get('idTo'),
+    }
@@ -0,0 +1,44 @@
+# expenses/report_workers.py
+# A riport feladatok processz-pool-ban futó részei. A modul szándékosan nem importál
+# modelleket, mert a spawn-olt gyerek processz ezt a django.setup() előtt tölti be.
+from datetime import date
+
+
+def init_process():
+    # A DJANGO_SETTINGS_MODULE a szülő környezetéből öröklődik
+    import django
+    django.setup()
+
+
+def month_summary(year, month):
+    """Egy hónap típusonkénti összesítése."""
+    from django.db import connection, connections
+
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT
+                    t.TYPE_NAME,
+                    sum(e.COST) as osszkoltes,
+                    t.LIMIT_MONTH
+                FROM
+                    EXPENSES e
+                    JOIN TYPES t on e.TYPE_ID = t.ID
+                WHERE
+                    e.DATE_EXP >= %s AND e.DATE_EXP < %s
+                GROUP BY
+                    t.TYPE_NAME,
+                    t.LIMIT_MONTH
+                ORDER BY
+                    osszkoltes DESC
+            """, [start, end])
+            rows = cursor.fetchall()
+    finally:
+        connections.close_all()
+
+    return [
+        {'month': f"{year}-{month:02d}", 'typeName': row[0], 'sumCost': row[1], 'limitMonth': row[2]}
+        for row in rows
+    ]
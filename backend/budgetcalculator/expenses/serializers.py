@@ -1,8 +1,20 @@
 # serializers.py
 from rest_framework import serializers
 from .models import Expenses, Types
+from .idalloc import expense_ids, type_ids
+
+# Az áttekintő mezői és a hozzájuk tartozó modell oszlopok (a fields= szűkítéshez)
+OVERVIEW_FIELD_COLUMNS = {
+    'id': 'id',
+    'date': 'date_exp',
+    'typeName': 'type_id__type_name',
+    'cost': 'cost',
+    'descript': 'comment',
+}
+OVERVIEW_DEFAULT_FIELDS = ['date', 'typeName', 'cost', 'descript']
 
 class ExpenseOverviewSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(read_only=True)
     date = serializers.DateField(source='date_exp')
     typeName = serializers.CharField(source='type_id.type_name')
     cost = serializers.IntegerField()
@@ -10,7 +22,27 @@ class ExpenseOverviewSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Expenses
-        fields = ['date', 'typeName', 'cost', 'descript']
+        fields = ['id', 'date', 'typeName', 'cost', 'descript']
+    
+    def __init__(self, *args, **kwargs):
+        # fields=None esetén az eredeti mezőkészlet (id nélkül)
+        fields = kwargs.pop('fields', None) or OVERVIEW_DEFAULT_FIELDS
+        super().__init__(*args, **kwargs)
+        for name in set(self.fields) - set(fields):
+            self.fields.pop(name)
+
+class ExpenseMultiGetRequestSerializer(serializers.Serializer):
+    expensesId = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        help_text="A lekérdezendő költések azonosítói"
+    )
+    fields = serializers.ListField(
+        child=serializers.ChoiceField(choices=list(OVERVIEW_FIELD_COLUMNS)),
+        required=False,
+        allow_empty=False,
+        help_text="Visszaadott mezők (alapértelmezés: date, typeName, cost, descript)"
+    )
 
 class ExpenseSummarySerializer(serializers.Serializer):
     month = serializers.CharField()
@@ -42,26 +74,19 @@ class ExpenseCreateSerializer(serializers.ModelSerializer):
         try:
             type_obj = Types.objects.get(id=type_id)
             
-            # SQL Server sequencia használata az ID generáláshoz
+            # Az ID a SEQ_EXPENSES sequenciából előre lefoglalt blokkból jön (a view a tranzakció előtt kéri le)
+            expense_id = validated_data.pop('id', None) or expense_ids.next_id()
             with connection.cursor() as cursor:
-                # OUTPUT clause használata az ID visszaadásához
                 cursor.execute("""
                     INSERT INTO EXPENSES (ID, DATE_EXP, TYPE_ID, COST, COMMENT) 
-                    OUTPUT INSERTED.ID
-                    VALUES (NEXT VALUE FOR SEQ_EXPENSES, %s, %s, %s, %s)
+                    VALUES (%s, %s, %s, %s, %s)
                 """, [
+                    expense_id,
                     validated_data['date_exp'],
                     type_obj.id,
                     validated_data['cost'],
                     validated_data.get('comment', '')
                 ])
-                
-                # Az beszúrt ID lekérdezése
-                result = cursor.fetchone()
-                expense_id = result[0] if result else None
-                
-                if not expense_id:
-                    raise Exception("Failed to get inserted ID")
             
             # Django objektum visszaadása a beszúrt adatokkal
             expense = Expenses(
@@ -132,24 +157,17 @@ class TypeCreateSerializer(serializers.Serializer):
         from django.db import connection
         
         try:
-            # SQL Server sequencia használata az ID generáláshoz
+            # Az ID a SEQ_TYPE sequenciából jön (a view a tranzakció előtt kéri le)
+            type_id = validated_data.get('typeId') or type_ids.next_id()
             with connection.cursor() as cursor:
-                # OUTPUT clause használata az ID visszaadásához
                 cursor.execute("""
                     INSERT INTO TYPES (ID, TYPE_NAME, LIMIT_MONTH) 
-                    OUTPUT INSERTED.ID
-                    VALUES (NEXT VALUE FOR SEQ_TYPE, %s, %s)
+                    VALUES (%s, %s, %s)
                 """, [
+                    type_id,
                     validated_data['typeName'],
                     validated_data.get('limitMonth', None)
                 ])
-                
-                # Az beszúrt ID lekérdezése
-                result = cursor.fetchone()
-                type_id = result[0] if result else None
-                
-                if not type_id:
-                    raise Exception("Failed to get inserted ID")
             
             # Dictionary visszaadása a JSON serialization miatt
             return {
@@ -177,4 +195,94 @@ class ExpenseUpdateSerializer(serializers.Serializer):
             Types.objects.get(id=value)
         except Types.DoesNotExist:
             raise serializers.ValidationError("Nem létező típus azonosító")
-        return value
\ No newline at end of file
+        return value
+
+# ÚJ: Időszakos költés / hátralévő keret serializer
+class BudgetSpentSerializer(serializers.Serializer):
+    typeId = serializers.IntegerField()
+    typeName = serializers.CharField(allow_null=True)
+    dateFrom = serializers.DateField()
+    dateTo = serializers.DateField()
+    spent = serializers.IntegerField()
+    limit = serializers.IntegerField(allow_null=True, help_text="Az időszakra vetített havi limit (csak period esetén)")
+    remaining = serializers.IntegerField(allow_null=True)
+
+# ÚJ: Delta szinkronizáció serializerek
+class SyncExpenseSerializer(serializers.ModelSerializer):
+    date = serializers.DateField(source='date_exp')
+    typeId = serializers.IntegerField(source='type_id.id')
+    typeName = serializers.CharField(source='type_id.type_name')
+    cost = serializers.IntegerField()
+    descript = serializers.CharField(source='comment')
+    
+    class Meta:
+        model = Expenses
+        fields = ['id', 'date', 'typeId', 'typeName', 'cost', 'descript']
+
+class DeltaSyncSerializer(serializers.Serializer):
+    since = serializers.IntegerField()
+    highWaterMark = serializers.IntegerField(help_text="A következő szinkronizáció since értéke")
+    fullResync = serializers.BooleanField(help_text="Igaz, ha a napló már nem tartalmazza a since óta történt változásokat")
+    expenses = SyncExpenseSerializer(many=True)
+    types = TypesListSerializer(many=True)
+    deletedExpenses = serializers.ListField(child=serializers.IntegerField())
+    deletedTypes = serializers.ListField(child=serializers.IntegerField())
+
+# ÚJ: Háttér riport feladatok serializerei
+class JobCreateSerializer(serializers.Serializer):
+    kind = serializers.ChoiceField(
+        choices=['yearly_summary', 'full_export', 'analytics_recompute'],
+        help_text="Riport típusa"
+    )
+    params = serializers.DictField(required=False, help_text="Riport paraméterei, pl. yearly_summary esetén {\"year\": 2025}")
+
+class JobStatusSerializer(serializers.Serializer):
+    jobId = serializers.IntegerField(source='id')
+    kind = serializers.CharField()
+    status = serializers.CharField(help_text="queued, running, done vagy failed")
+    progress = serializers.IntegerField(help_text="Készültség százalékban")
+    createdAt = serializers.DateTimeField(source='created_at')
+    startedAt = serializers.DateTimeField(source='started_at', allow_null=True)
+    finishedAt = serializers.DateTimeField(source='finished_at', allow_null=True)
+    error = serializers.CharField(allow_null=True)
+
+# ÚJ: Eloszlás statisztikák serializerei
+class DistributionTopItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    date = serializers.DateField()
+    cost = serializers.IntegerField()
+    descript = serializers.CharField(allow_null=True)
+
+class DistributionSerializer(serializers.Serializer):
+    month = serializers.CharField(allow_null=True, help_text="YYYY-MM, granularity=range esetén null")
+    typeId = serializers.IntegerField()
+    typeName = serializers.CharField(allow_null=True)
+    count = serializers.IntegerField()
+    sumCost = serializers.IntegerField()
+    median = serializers.FloatField(allow_null=True)
+    p90 = serializers.FloatField(allow_null=True)
+    approximate = serializers.BooleanField()
+    top = DistributionTopItemSerializer(many=True, help_text="A legnagyobb tételek (közelítő módban üres)")
+
+# ÚJ: Költések kötegelt törlése (purge) serializer
+class ExpensePurgeSerializer(serializers.Serializer):
+    dateFrom = serializers.DateField(required=False, help_text="Törlendő időszak kezdete")
+    dateTo = serializers.DateField(required=False, help_text="Törlendő időszak vége (zárt)")
+    typeIds = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False,
+                                    help_text="Törlendő típusok")
+    idFrom = serializers.IntegerField(required=False, help_text="Legkisebb törlendő költés ID (zárt)")
+    idTo = serializers.IntegerField(required=False, help_text="Legnagyobb törlendő költés ID (zárt)")
+    dryRun = serializers.BooleanField(default=False, help_text="Csak a törlendő sorok számát adja vissza")
+    batchSize = serializers.IntegerField(required=False, min_value=1, max_value=2000,
+                                         help_text="Kötegméret (alapértelmezés: PURGE_BATCH_SIZE)")
+    pauseSeconds = serializers.FloatField(required=False, min_value=0, max_value=60,
+                                          help_text="Várakozás két köteg között")
+    
+    def validate(self, data):
+        if not any(data.get(key) is not None for key in ('dateFrom', 'dateTo', 'typeIds', 'idFrom', 'idTo')):
+            raise serializers.ValidationError("Legalább egy szűrő (dátum, típus vagy ID tartomány) megadása kötelező")
+        if data.get('dateFrom') and data.get('dateTo') and data['dateFrom'] > data['dateTo']:
+            raise serializers.ValidationError("A dateFrom nem lehet későbbi, mint a dateTo")
+        if data.get('idFrom') is not None and data.get('idTo') is not None and data['idFrom'] > data['idTo']:
+            raise serializers.ValidationError("Az idFrom nem lehet nagyobb, mint az idTo")
+        return data
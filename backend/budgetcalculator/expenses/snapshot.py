@@ -0,0 +1,271 @@
+# expenses/snapshot.py
+# Oszlopos, memory-mapelt pillanatkép az EXPENSES tábláról a csak olvasó összesítésekhez
+# (jelenleg a /koltesek/osszegzo végpont használja). Csak az ehhez szükséges oszlopokat írjuk ki.
+# A worker processzek ugyanazokat a fájlokat mmap-elik, így az adat egyszer van a page cache-ben;
+# a pillanatkép óta írt sorokat a változásnapló alapján az adatbázisból olvassuk rá (delta overlay).
+# A havi/típusonkénti összegeket építéskor előre kiszámoljuk, kérésenként csak a változott sorokat
+# korrigáljuk, így a kérés ideje nem függ a tábla méretétől.
+import json
+import logging
+import mmap
+import os
+import shutil
+import sys
+import threading
+import uuid
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db import connection
+
+from .changelog import ENTITY_EXPENSE, changes_since, compaction_floor, high_water_mark, locking_read_hint
+from .db_utils import in_chunks
+from .models import Types
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 2
+CURRENT_FILE = 'CURRENT'
+EPOCH = date(1970, 1, 1)
+NULL_DAY = -2 ** 31
+INT16_MAX = 2 ** 15 - 1
+
+# Oszlop fájlok: név -> array típuskód (natív bájtsorrend)
+COLUMNS = {
+    'id': 'i',          # int32
+    'date': 'i',        # int32, napok 1970-01-01 óta, NULL_DAY ha nincs dátum
+    'type_id': 'h',     # int16
+    'cost': 'i',        # int32, NULL helyett 0 (összegzésnél egyenértékű)
+}
+
+
+def _snapshot_dir():
+    return str(getattr(settings, 'SNAPSHOT_DIR', os.path.join(settings.BASE_DIR, 'snapshots')))
+
+
+def _to_day(value):
+    if value is None:
+        return NULL_DAY
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    elif isinstance(value, datetime):
+        value = value.date()
+    return (value - EPOCH).days
+
+
+def _month_of(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value[:7]
+    return f"{value.year}-{value.month:02d}"
+
+
+def build_snapshot():
+    """
+    Új pillanatkép írása. A változásnapló sorszámát az olvasás előtt rögzítjük,
+    így az olvasás közben történt írások az overlay-ben biztosan megjelennek.
+    """
+    change_no = high_water_mark()
+    base_dir = _snapshot_dir()
+    name = f"snap-{datetime.now():%Y%m%d-%H%M%S}-{change_no}-{uuid.uuid4().hex[:6]}"
+    target = os.path.join(base_dir, name)
+    os.makedirs(target)
+
+    columns = {column: array(typecode) for column, typecode in COLUMNS.items()}
+    # (hónap, típus) -> [darab, összeg]
+    sums = defaultdict(lambda: [0, 0])
+
+    with connection.cursor() as cursor:
+        # Zároló olvasás: a sorszám kiolvasásakor még futó írások hatása is bekerül a pillanatképbe
+        cursor.execute(f"""
+            SELECT ID, DATE_EXP, TYPE_ID, COST
+            FROM EXPENSES{locking_read_hint()}
+            ORDER BY ID
+        """)
+        while True:
+            rows = cursor.fetchmany(5000)
+            if not rows:
+                break
+            for exp_id, date_exp, type_id, cost in rows:
+                if type_id > INT16_MAX:
+                    raise ValueError(f"TYPE_ID {type_id} does not fit the int16 column")
+                columns['id'].append(exp_id)
+                columns['date'].append(_to_day(date_exp))
+                columns['type_id'].append(type_id)
+                columns['cost'].append(cost or 0)
+                entry = sums[(_month_of(date_exp), type_id)]
+                entry[0] += 1
+                entry[1] += cost or 0
+
+    for column, values in columns.items():
+        with open(os.path.join(target, f"{column}.bin"), 'wb') as f:
+            values.tofile(f)
+
+    with open(os.path.join(target, 'sums.json'), 'w', encoding='utf-8') as f:
+        json.dump([[month, type_id, count, total] for (month, type_id), (count, total) in sums.items()], f)
+
+    with open(os.path.join(target, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': FORMAT_VERSION,
+            'rows': len(columns['id']),
+            'changeNo': change_no,
+            'builtAt': datetime.now().isoformat(),
+            'byteorder': sys.byteorder,
+        }, f)
+
+    # Atomikus átváltás: a CURRENT fájl cseréje után az új olvasások már az új könyvtárat látják
+    tmp = os.path.join(base_dir, CURRENT_FILE + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(name)
+    os.replace(tmp, os.path.join(base_dir, CURRENT_FILE))
+
+    _remove_old_snapshots(base_dir, keep={name})
+    return name, len(columns['id']), change_no
+
+
+def _remove_old_snapshots(base_dir, keep, retain=1):
+    # Az előző pillanatképet meghagyjuk; a még nyitott mmap-ek a törlés után is érvényesek maradnak
+    old = sorted(n for n in os.listdir(base_dir) if n.startswith('snap-') and n not in keep)
+    for name in old[:-retain] if retain else old:
+        shutil.rmtree(os.path.join(base_dir, name), ignore_errors=True)
+
+
+class Snapshot:
+    """Egy pillanatkép oszlopai csak olvasható mmap-ként, és az építéskor számolt havi összegek."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta['version'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {self.meta['version']}")
+        if self.meta['byteorder'] != sys.byteorder:
+            raise ValueError(f"Snapshot byte order {self.meta['byteorder']} does not match this machine")
+        self.rows = self.meta['rows']
+        self.change_no = self.meta['changeNo']
+        self._maps = []
+        self.columns = {column: self._map(f"{column}.bin", typecode) for column, typecode in COLUMNS.items()}
+        with open(os.path.join(path, 'sums.json'), encoding='utf-8') as f:
+            self.sums = {(month, type_id): (count, total) for month, type_id, count, total in json.load(f)}
+
+    def _map(self, filename, typecode):
+        with open(os.path.join(self.path, filename), 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b'').cast(typecode)
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return memoryview(mapped).cast(typecode)
+
+    def find(self, exp_id):
+        """Az exp_id sor indexe (az id oszlop ID szerint rendezett), vagy None."""
+        ids = self.columns['id']
+        i = bisect_left(ids, exp_id)
+        return i if i < self.rows and ids[i] == exp_id else None
+
+    def month(self, i):
+        day = self.columns['date'][i]
+        return None if day == NULL_DAY else (EPOCH + timedelta(days=day)).strftime('%Y-%m')
+
+
+_current = None
+_current_name = None
+_current_lock = threading.Lock()
+
+
+def current_snapshot():
+    """Az aktuális pillanatkép, vagy None, ha nincs. A CURRENT fájl változását minden hívás ellenőrzi."""
+    global _current, _current_name
+    pointer = os.path.join(_snapshot_dir(), CURRENT_FILE)
+    try:
+        with open(pointer, encoding='utf-8') as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+
+    with _current_lock:
+        if name != _current_name:
+            # A régi mmap-eket nem zárjuk: egy párhuzamos kérés még használhatja, a GC felszabadítja
+            try:
+                snapshot = Snapshot(os.path.join(_snapshot_dir(), name))
+            except (OSError, ValueError, KeyError) as e:
+                # Pl. a CURRENT által mutatott könyvtárat már törölték; a hívó az adatbázisból számol
+                logger.warning("Snapshot %s is not usable: %s", name, e)
+                return None
+            _current = snapshot
+            _current_name = name
+        return _current
+
+
+def _overlay(snapshot):
+    """
+    A pillanatkép óta módosult költések aktuális sorai az adatbázisból.
+    None, ha a változásnapló már nem fedi le a pillanatkép óta eltelt időt.
+    """
+    if compaction_floor() > snapshot.change_no:
+        return None
+    _, changed = changes_since(snapshot.change_no)
+    changed_ids = changed[ENTITY_EXPENSE]
+
+    rows = []
+    for chunk in in_chunks(sorted(changed_ids)):
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT ID, DATE_EXP, TYPE_ID, COST
+                FROM EXPENSES
+                WHERE ID IN ({', '.join(['%s'] * len(chunk))})
+            """, chunk)
+            rows.extend(cursor.fetchall())
+    return changed_ids, rows
+
+
+def snapshot_summary():
+    """
+    Az /koltesek/osszegzo eredménye a pillanatképből és az overlay-ből:
+    havonta és típusonként az összeg, a típus nevével és havi limitjével.
+    None, ha nincs használható pillanatkép (ilyenkor a hívó az adatbázisból számol).
+    """
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return None
+    overlay = _overlay(snapshot)
+    if overlay is None:
+        logger.info("Snapshot %s is older than the change log floor, falling back to the database", snapshot.path)
+        return None
+    changed_ids, overlay_rows = overlay
+
+    # Az előre számolt összegekből kivonjuk a változott sorok pillanatképbeli értékét,
+    # majd hozzáadjuk az aktuális értéküket az adatbázisból
+    sums = dict(snapshot.sums)
+    type_ids = snapshot.columns['type_id']
+    costs = snapshot.columns['cost']
+    for exp_id in changed_ids:
+        i = snapshot.find(exp_id)
+        if i is not None:
+            _add(sums, (snapshot.month(i), type_ids[i]), -1, -costs[i])
+    for exp_id, date_exp, type_id, cost in overlay_rows:
+        _add(sums, (_month_of(date_exp), type_id), 1, cost or 0)
+
+    # A SQL lekérdezéshez hasonlóan hónap, típus név és limit szerint csoportosítunk
+    types = {t.id: t for t in Types.objects.all()}
+    summary = defaultdict(int)
+    for (month, type_id), (count, total) in sums.items():
+        type_obj = types.get(type_id)
+        if type_obj is None or count <= 0:
+            continue
+        summary[(month, type_obj.type_name, type_obj.limit_month)] += total
+
+    result = [
+        {'month': month, 'typeName': type_name, 'sumCost': total, 'limitMonth': limit_month}
+        for (month, type_name, limit_month), total in summary.items()
+    ]
+    result.sort(key=lambda row: (row['month'] or '', row['sumCost']), reverse=True)
+    return result
+
+
+def _add(sums, key, count, total):
+    current_count, current_total = sums.get(key, (0, 0))
+    sums[key] = (current_count + count, current_total + total)
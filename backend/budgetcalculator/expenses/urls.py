@@ -10,4 +10,10 @@ urlpatterns = [
     path('koltesek/limitmod/<int:type_id>', views.update_limit, name='update_limit'),
     path('expensetype', views.create_type, name='create_type'),
     path('expenses/<int:expenses_id>', views.update_expense, name='update_expense'),
+    path('expenses/purge', views.purge_expenses, name='purge_expenses'),
+    path('koltesek/keret', views.budget_spent, name='budget_spent'),
+    path('koltesek/sync', views.delta_sync, name='delta_sync'),
+    path('koltesek/eloszlas', views.expense_distribution, name='expense_distribution'),
+    path('jobs', views.create_job, name='create_job'),
+    path('jobs/<int:job_id>', views.job_status, name='job_status'),
 ]
\ No newline at end of file
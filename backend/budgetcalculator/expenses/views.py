@@ -1,8 +1,9 @@
 # expenses/views.py frissített verzió Swagger dokumentációval és új végpontokkal
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
-from django.db import connection
+from django.db import connection, transaction
 from django.db.models import Sum
 from django.shortcuts import get_object_or_404
 from drf_yasg.utils import swagger_auto_schema
@@ -10,6 +11,9 @@ from drf_yasg import openapi
 from .models import Expenses, Types
 from .serializers import (
     ExpenseOverviewSerializer, 
+    ExpenseMultiGetRequestSerializer,
+    OVERVIEW_FIELD_COLUMNS,
+    OVERVIEW_DEFAULT_FIELDS,
     ExpenseSummarySerializer,
     ExpenseCreateSerializer,
     ExpenseCreateRequestSerializer,
@@ -17,8 +21,26 @@ from .serializers import (
     TypesListSerializer,
     TypesUpdateSerializer,
     TypeCreateSerializer,
-    ExpenseUpdateSerializer
+    ExpenseUpdateSerializer,
+    BudgetSpentSerializer,
+    SyncExpenseSerializer,
+    DeltaSyncSerializer,
+    JobCreateSerializer,
+    JobStatusSerializer,
+    DistributionSerializer,
+    ExpensePurgeSerializer
 )
+from .budget_index import cost_index, period_bounds, PERIODS
+from .distribution import cost_sketches, exact_distribution, GRANULARITIES, GRANULARITY_MONTH
+from .changelog import record_change, changes_since, compaction_floor, high_water_mark, ENTITY_EXPENSE, ENTITY_TYPE
+from .db_utils import in_chunks
+from .snapshot import snapshot_summary
+from . import idalloc
+from . import jobs
+from .purge import count_expenses
+from .models import ReportJobs
+import json
+from datetime import date
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,11 +49,87 @@ logger = logging.getLogger(__name__)
 expense_id_param = openapi.Parameter(
     'expensesId', 
     openapi.IN_QUERY, 
-    description="Költés egyedi azonosítója", 
+    description="Költés egyedi azonosítója, vagy azonosítók vesszővel elválasztva (pl. 1,2,3)", 
+    type=openapi.TYPE_STRING,
+    required=False
+)
+
+fields_param = openapi.Parameter(
+    'fields',
+    openapi.IN_QUERY,
+    description="Visszaadott mezők vesszővel elválasztva (id, date, typeName, cost, descript)",
+    type=openapi.TYPE_STRING,
+    required=False
+)
+
+type_ids_param = openapi.Parameter(
+    'typeIds',
+    openapi.IN_QUERY,
+    description="Típus azonosítók vesszővel elválasztva (alapértelmezés: minden típus)",
+    type=openapi.TYPE_STRING,
+    required=False
+)
+
+date_from_param = openapi.Parameter(
+    'from',
+    openapi.IN_QUERY,
+    description="Időszak kezdete (YYYY-MM-DD), a 'to' paraméterrel együtt",
+    type=openapi.TYPE_STRING,
+    format=openapi.FORMAT_DATE,
+    required=False
+)
+
+date_to_param = openapi.Parameter(
+    'to',
+    openapi.IN_QUERY,
+    description="Időszak vége (YYYY-MM-DD), zárt intervallum",
+    type=openapi.TYPE_STRING,
+    format=openapi.FORMAT_DATE,
+    required=False
+)
+
+period_param = openapi.Parameter(
+    'period',
+    openapi.IN_QUERY,
+    description="Aktuális időszak, ha nincs from/to: week, month (alapértelmezés), quarter, rolling30",
+    type=openapi.TYPE_STRING,
+    enum=list(PERIODS),
+    required=False
+)
+
+since_param = openapi.Parameter(
+    'since',
+    openapi.IN_QUERY,
+    description="Az előző szinkronizáció highWaterMark értéke (0: első, teljes szinkronizáció)",
+    type=openapi.TYPE_INTEGER,
+    required=True
+)
+
+top_param = openapi.Parameter(
+    'top',
+    openapi.IN_QUERY,
+    description="A legnagyobb tételek száma csoportonként (alapértelmezés: 3, maximum 100)",
     type=openapi.TYPE_INTEGER,
     required=False
 )
 
+approx_param = openapi.Parameter(
+    'approx',
+    openapi.IN_QUERY,
+    description="1: közelítő medián/p90 a tárolt havi hisztogramokból, egész hónapokra, top-N nélkül",
+    type=openapi.TYPE_INTEGER,
+    required=False
+)
+
+granularity_param = openapi.Parameter(
+    'granularity',
+    openapi.IN_QUERY,
+    description="month: havonta és típusonként (alapértelmezés), range: a teljes időszakra típusonként",
+    type=openapi.TYPE_STRING,
+    enum=list(GRANULARITIES),
+    required=False
+)
+
 limit_month_param = openapi.Parameter(
     'limitMonth', 
     openapi.IN_QUERY, 
@@ -42,38 +140,97 @@ limit_month_param = openapi.Parameter(
 
 @swagger_auto_schema(
     method='get',
-    operation_description="A korábbi költéseket tételenként visszaadó API. Ha expensesId megadva, egy konkrét költést ad vissza.",
-    manual_parameters=[expense_id_param],
+    operation_description="A korábbi költéseket tételenként visszaadó API. Ha expensesId megadva, egy konkrét költést, "
+                          "vesszővel elválasztott lista esetén a megadott költéseket adja vissza (egy IN lekérdezéssel). "
+                          "A fields paraméterrel a lekérdezett és visszaadott mezők szűkíthetők.",
+    manual_parameters=[expense_id_param, fields_param],
     responses={
         200: ExpenseOverviewSerializer(many=True),
+        400: 'Bad Request - hibás paraméter',
         404: 'Expense not found',
         500: 'Internal server error'
     },
     tags=['Expenses']
 )
-@api_view(['GET'])
+@swagger_auto_schema(
+    method='post',
+    operation_description="Több költés lekérdezése egyszerre: az expensesId lista és a fields mezőlista a kérés törzsében. "
+                          "A nem létező azonosítók kimaradnak a válaszból.",
+    request_body=ExpenseMultiGetRequestSerializer,
+    responses={
+        200: ExpenseOverviewSerializer(many=True),
+        400: 'Bad Request - hibás adatok',
+        500: 'Internal server error'
+    },
+    tags=['Expenses']
+)
+@api_view(['GET', 'POST'])
 def expense_overview(request):
     """
     GET /koltesek/attekinto
+    POST /koltesek/attekinto
     A korábbi költéseket tételenként visszaadó API.
     """
     try:
-        expense_id = request.query_params.get('expensesId')
-        
-        if expense_id:
+        if request.method == 'POST':
+            request_serializer = ExpenseMultiGetRequestSerializer(data=request.data)
+            if not request_serializer.is_valid():
+                return Response(request_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            expense_ids = request_serializer.validated_data['expensesId']
+            fields = request_serializer.validated_data.get('fields')
+            single = False
+        else:
+            expense_ids = request.query_params.get('expensesId')
+            fields = request.query_params.get('fields')
+            single = bool(expense_ids) and ',' not in expense_ids
             try:
-                expense = Expenses.objects.select_related('type_id').get(id=expense_id)
-                serializer = ExpenseOverviewSerializer(expense)
-                return Response([serializer.data], status=status.HTTP_200_OK)
-            except Expenses.DoesNotExist:
+                expense_ids = [int(i) for i in expense_ids.split(',') if i.strip()] if expense_ids else None
+            except ValueError:
+                return Response(
+                    {"error": "expensesId must be an integer or a comma separated list of integers"}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if expense_ids == []:
+                # Pl. expensesId=, -- ne adjuk vissza csendben a teljes táblát
+                return Response(
+                    {"error": "expensesId must contain at least one integer"}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else None
+        
+        if fields is not None:
+            unknown = [f for f in fields if f not in OVERVIEW_FIELD_COLUMNS]
+            if unknown or not fields:
+                return Response(
+                    {"error": f"fields must be a subset of: {', '.join(OVERVIEW_FIELD_COLUMNS)}"}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        # Csak a kért mezők oszlopait olvassuk, a típust csak typeName esetén joinoljuk
+        serialized_fields = fields or OVERVIEW_DEFAULT_FIELDS
+        queryset = Expenses.objects.only(*[OVERVIEW_FIELD_COLUMNS[f] for f in serialized_fields])
+        if 'typeName' in serialized_fields:
+            queryset = queryset.select_related('type_id')
+        
+        if expense_ids:
+            found = {}
+            for chunk in in_chunks(dict.fromkeys(expense_ids)):
+                for expense in queryset.filter(id__in=chunk).order_by():
+                    found[expense.id] = expense
+            
+            if single and not found:
                 return Response(
                     {"error": "Expense not found"}, 
                     status=status.HTTP_404_NOT_FOUND
                 )
+            
+            # A kért sorrendben, a nem létezőket kihagyva
+            expenses = [found[i] for i in dict.fromkeys(expense_ids) if i in found]
         else:
-            expenses = Expenses.objects.select_related('type_id').order_by('-date_exp')
-            serializer = ExpenseOverviewSerializer(expenses, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            expenses = queryset.order_by('-date_exp')
+        
+        serializer = ExpenseOverviewSerializer(expenses, many=True, fields=fields)
+        return Response(serializer.data, status=status.HTTP_200_OK)
             
     except Exception as e:
         logger.error(f"Error in expense_overview: {str(e)}")
@@ -98,10 +255,22 @@ def expense_summary(request):
     A korábbi kiadásokat havonként és típusonként visszaadó API
     """
     try:
+        # Ha van oszlopos pillanatkép, abból számolunk (adatbázis terhelés nélkül)
+        summary_data = snapshot_summary()
+        if summary_data is not None:
+            serializer = ExpenseSummarySerializer(summary_data, many=True)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        
+        # Lokális SQLite adatbázison (pl. loadtest) nincs CONVERT
+        if connection.vendor == 'sqlite':
+            month_expr = "strftime('%Y-%m', e.DATE_EXP)"
+        else:
+            month_expr = "CONVERT(CHAR(7), e.DATE_EXP, 120)"
+
         with connection.cursor() as cursor:
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT
-                    CONVERT(CHAR(7), e.DATE_EXP, 120) as honap, 
+                    {month_expr} as honap, 
                     t.TYPE_NAME, 
                     sum(e.COST) as osszkoltes, 
                     t.LIMIT_MONTH 
@@ -109,7 +278,7 @@ def expense_summary(request):
                     EXPENSES e 
                     JOIN TYPES t on e.TYPE_ID = t.ID
                 GROUP BY
-                    CONVERT(CHAR(7), e.DATE_EXP, 120), 
+                    {month_expr}, 
                     t.TYPE_NAME , 
                     t.LIMIT_MONTH
                 ORDER BY
@@ -171,7 +340,13 @@ def create_expense(request):
         serializer = ExpenseCreateSerializer(data=request.data)
         
         if serializer.is_valid():
-            expense = serializer.save()  # A serializer create() metódusa kezeli
+            # Az ID foglalás saját kapcsolaton fut, ezért a tranzakció előtt (SQLite-on különben a saját zárunkra várna)
+            expense_id = idalloc.expense_ids.next_id()
+            with transaction.atomic():
+                expense = serializer.save(id=expense_id)  # A serializer create() metódusa kezeli
+                cost_index.expense_changed(new=(expense.type_id.id, expense.date_exp, expense.cost))
+                cost_sketches.expense_changed(new=(expense.type_id.id, expense.date_exp, expense.cost))
+                record_change(ENTITY_EXPENSE, expense.id)
             
             # Response formázás
             response_data = {
@@ -258,7 +433,9 @@ def update_limit(request, type_id):
         try:
             type_obj = Types.objects.get(id=type_id)
             type_obj.limit_month = limit_month
-            type_obj.save()
+            with transaction.atomic():
+                type_obj.save()
+                record_change(ENTITY_TYPE, type_obj.id)
             
             serializer = TypesUpdateSerializer(type_obj)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -309,7 +486,11 @@ def create_type(request):
         serializer = TypeCreateSerializer(data=request.data)
         
         if serializer.is_valid():
-            result = serializer.save()  # Dictionary-t ad vissza
+            # Az ID foglalás a tranzakció előtt, mint a create_expense-ben
+            type_id = idalloc.type_ids.next_id()
+            with transaction.atomic():
+                result = serializer.save(typeId=type_id)  # Dictionary-t ad vissza
+                record_change(ENTITY_TYPE, result['typeId'])
             return Response(result, status=status.HTTP_201_CREATED)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -368,19 +549,29 @@ def update_expense(request, expenses_id):
             # Type objektum lekérése
             type_obj = Types.objects.get(id=serializer.validated_data['typeId'])
             
-            # Raw SQL update a managed = False miatt
-            with connection.cursor() as cursor:
-                cursor.execute("""
-                    UPDATE EXPENSES 
-                    SET DATE_EXP = %s, TYPE_ID = %s, COST = %s, COMMENT = %s
-                    WHERE ID = %s
-                """, [
-                    serializer.validated_data['date'],
-                    serializer.validated_data['typeId'],
-                    serializer.validated_data['cost'],
-                    serializer.validated_data.get('description', ''),
-                    expenses_id
-                ])
+            with transaction.atomic():
+                # A régi értékek zárolt újraolvasása a kumulált index frissítéséhez
+                expense = Expenses.objects.select_for_update().get(id=expenses_id)
+                
+                # Raw SQL update a managed = False miatt
+                with connection.cursor() as cursor:
+                    cursor.execute("""
+                        UPDATE EXPENSES 
+                        SET DATE_EXP = %s, TYPE_ID = %s, COST = %s, COMMENT = %s
+                        WHERE ID = %s
+                    """, [
+                        serializer.validated_data['date'],
+                        serializer.validated_data['typeId'],
+                        serializer.validated_data['cost'],
+                        serializer.validated_data.get('description', ''),
+                        expenses_id
+                    ])
+                
+                old_values = (expense.type_id_id, expense.date_exp, expense.cost)
+                new_values = (serializer.validated_data['typeId'], serializer.validated_data['date'], serializer.validated_data['cost'])
+                cost_index.expense_changed(old=old_values, new=new_values)
+                cost_sketches.expense_changed(old=old_values, new=new_values)
+                record_change(ENTITY_EXPENSE, expenses_id)
             
             response_data = {
                 'expensesId': expenses_id,
@@ -403,4 +594,378 @@ def update_expense(request, expenses_id):
         return Response(
             {"error": "Internal server error"}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="Típusonkénti költés egy tetszőleges időszakban (from/to), vagy az aktuális időszakban (period) a hátralévő kerettel. "
+                          "A kumulált napi index alapján típusonként két kereséssel számol, az EXPENSES tábla szkennelése nélkül.",
+    manual_parameters=[type_ids_param, date_from_param, date_to_param, period_param],
+    responses={
+        200: BudgetSpentSerializer(many=True),
+        400: 'Bad Request - hibás paraméter',
+        500: 'Internal server error'
+    },
+    tags=['Types']
+)
+@api_view(['GET'])
+def budget_spent(request):
+    """
+    GET /koltesek/keret
+    Típusonkénti költés és hátralévő keret tetszőleges időszakra.
+    """
+    try:
+        type_ids = request.query_params.get('typeIds')
+        date_from = request.query_params.get('from')
+        date_to = request.query_params.get('to')
+        period = request.query_params.get('period')
+        
+        types = Types.objects.all().order_by('id')
+        if type_ids:
+            try:
+                types = types.filter(id__in=[int(t) for t in type_ids.split(',') if t.strip()])
+            except ValueError:
+                return Response(
+                    {"error": "typeIds must be a comma separated list of integers"}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        if date_from or date_to:
+            if period:
+                return Response(
+                    {"error": "Use either from/to or period, not both"}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            try:
+                start = date.fromisoformat(date_from)
+                end = date.fromisoformat(date_to)
+            except (TypeError, ValueError):
+                return Response(
+                    {"error": "from and to must both be dates in YYYY-MM-DD format"}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if start > end:
+                return Response(
+                    {"error": "from must not be after to"}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            limit_factor = None
+        else:
+            try:
+                start, end, limit_factor = period_bounds(period or 'month')
+            except ValueError:
+                return Response(
+                    {"error": f"period must be one of: {', '.join(PERIODS)}"}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        budget_data = []
+        for type_obj in types:
+            spent = cost_index.spent(type_obj.id, start, end)
+            limit = None
+            if limit_factor is not None and type_obj.limit_month is not None:
+                limit = round(type_obj.limit_month * limit_factor)
+            budget_data.append({
+                'typeId': type_obj.id,
+                'typeName': type_obj.type_name,
+                'dateFrom': start,
+                'dateTo': end,
+                'spent': spent,
+                'limit': limit,
+                'remaining': limit - spent if limit is not None else None
+            })
+        
+        serializer = BudgetSpentSerializer(budget_data, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        logger.error(f"Error in budget_spent: {str(e)}")
+        return Response(
+            {"error": "Internal server error"}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="Delta szinkronizáció: a since sorszám óta beszúrt, módosított vagy törölt költések és típusok, "
+                          "valamint az új highWaterMark. fullResync=true esetén a kliensnek a teljes listát újra kell töltenie "
+                          "(/koltesek/attekinto, /koltesek/limit_kiir), majd a kapott highWaterMark-tól folytatnia.",
+    manual_parameters=[since_param],
+    responses={
+        200: DeltaSyncSerializer,
+        400: 'Bad Request - hiányzó vagy hibás paraméter',
+        500: 'Internal server error'
+    },
+    tags=['Expenses']
+)
+@api_view(['GET'])
+def delta_sync(request):
+    """
+    GET /koltesek/sync?since=<n>
+    A since óta történt változások visszaadása offline/mobil klienseknek.
+    """
+    try:
+        since = request.query_params.get('since')
+        
+        try:
+            since = int(since)
+            if since < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "since must be a non-negative integer"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Első szinkronizáció (since=0), vagy a napló már tömörítve lett a since pont után
+        if since < compaction_floor():
+            return Response({
+                'since': since,
+                'highWaterMark': high_water_mark(),
+                'fullResync': True,
+                'expenses': [],
+                'types': [],
+                'deletedExpenses': [],
+                'deletedTypes': []
+            }, status=status.HTTP_200_OK)
+        
+        high_water, changed = changes_since(since)
+        
+        expenses = []
+        for chunk in in_chunks(sorted(changed[ENTITY_EXPENSE])):
+            expenses.extend(Expenses.objects.select_related('type_id').filter(id__in=chunk).order_by('id'))
+        types = []
+        for chunk in in_chunks(sorted(changed[ENTITY_TYPE])):
+            types.extend(Types.objects.filter(id__in=chunk).order_by('id'))
+        
+        # Ami a naplóban szerepel, de már nem létezik, az törölve lett
+        found_expenses = {e.id for e in expenses}
+        found_types = {t.id for t in types}
+        
+        return Response({
+            'since': since,
+            'highWaterMark': high_water,
+            'fullResync': False,
+            'expenses': SyncExpenseSerializer(expenses, many=True).data,
+            'types': TypesListSerializer(types, many=True).data,
+            'deletedExpenses': sorted(changed[ENTITY_EXPENSE] - found_expenses),
+            'deletedTypes': sorted(changed[ENTITY_TYPE] - found_types)
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        logger.error(f"Error in delta_sync: {str(e)}")
+        return Response(
+            {"error": "Internal server error"}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@swagger_auto_schema(
+    method='post',
+    operation_description="Nehéz riport (éves összesítő, teljes export, analitika újraszámolás) indítása háttérben. "
+                          "Azonos futó feladat esetén azt adja vissza, változatlan adatok esetén a korábbi kész eredményt "
+                          "(az analitika újraszámolás mindig újra lefut).",
+    request_body=JobCreateSerializer,
+    responses={
+        202: JobStatusSerializer,
+        400: 'Bad Request - hibás adatok',
+        500: 'Internal server error'
+    },
+    tags=['Jobs']
+)
+@api_view(['POST'])
+def create_job(request):
+    """
+    POST /jobs
+    Riport feladat indítása.
+    """
+    try:
+        serializer = JobCreateSerializer(data=request.data)
+        
+        if serializer.is_valid():
+            try:
+                job, created = jobs.submit(
+                    serializer.validated_data['kind'],
+                    serializer.validated_data.get('params', {})
+                )
+            except ValueError as e:
+                return Response({"params": [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+            
+            response_status = status.HTTP_202_ACCEPTED if job.status != jobs.STATUS_DONE else status.HTTP_200_OK
+            return Response(JobStatusSerializer(job).data, status=response_status)
+        else:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            
+    except Exception as e:
+        logger.error(f"Error in create_job: {str(e)}")
+        return Response(
+            {"error": "Internal server error"}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="Riport feladat állapota és készültsége. Kész feladatnál a result mező tartalmazza az eredményt.",
+    responses={
+        200: JobStatusSerializer,
+        404: 'Job not found',
+        500: 'Internal server error'
+    },
+    tags=['Jobs']
+)
+@api_view(['GET'])
+def job_status(request, job_id):
+    """
+    GET /jobs/<job_id>
+    Riport feladat állapotának lekérdezése.
+    """
+    try:
+        try:
+            job = ReportJobs.objects.get(id=job_id)
+        except ReportJobs.DoesNotExist:
+            return Response(
+                {"error": "Job not found"}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        response_data = dict(JobStatusSerializer(job).data)
+        if job.status == jobs.STATUS_DONE:
+            response_data['result'] = json.loads(job.result)
+        return Response(response_data, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        logger.error(f"Error in job_status: {str(e)}")
+        return Response(
+            {"error": "Internal server error"}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="Havonta és típusonként a költések darabszáma, összege, mediánja, p90 értéke és a legnagyobb tételek. "
+                          "A medián és a p90 a PERCENTILE_CONT definíciója szerint (lineáris interpolációval) számol. "
+                          "approx=1 esetén a tárolt havi hisztogramokból számol (kb. 1% relatív hiba), az EXPENSES szkennelése nélkül.",
+    manual_parameters=[type_ids_param, date_from_param, date_to_param, top_param, approx_param, granularity_param],
+    responses={
+        200: DistributionSerializer(many=True),
+        400: 'Bad Request - hibás paraméter',
+        500: 'Internal server error'
+    },
+    tags=['Expenses']
+)
+@api_view(['GET'])
+def expense_distribution(request):
+    """
+    GET /koltesek/eloszlas
+    Típusonkénti eloszlás statisztikák havonta vagy a teljes időszakra.
+    """
+    try:
+        type_ids = request.query_params.get('typeIds')
+        date_from = request.query_params.get('from')
+        date_to = request.query_params.get('to')
+        approx = request.query_params.get('approx') == '1'
+        granularity = request.query_params.get('granularity', GRANULARITY_MONTH)
+        
+        try:
+            top = int(request.query_params.get('top', 3))
+            if not 0 <= top <= 100:
+                raise ValueError
+        except ValueError:
+            return Response(
+                {"error": "top must be an integer between 0 and 100"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if granularity not in GRANULARITIES:
+            return Response(
+                {"error": f"granularity must be one of: {', '.join(GRANULARITIES)}"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            type_ids = [int(t) for t in type_ids.split(',') if t.strip()] if type_ids else None
+            date_from = date.fromisoformat(date_from) if date_from else None
+            date_to = date.fromisoformat(date_to) if date_to else None
+        except ValueError:
+            return Response(
+                {"error": "typeIds must be a comma separated list of integers, from/to dates in YYYY-MM-DD format"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if approx:
+            distribution = cost_sketches.distribution(date_from, date_to, type_ids, granularity)
+        else:
+            distribution = exact_distribution(date_from, date_to, type_ids, top, granularity)
+        
+        serializer = DistributionSerializer(distribution, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        logger.error(f"Error in expense_distribution: {str(e)}")
+        return Response(
+            {"error": "Internal server error"}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@swagger_auto_schema(
+    method='post',
+    operation_description="Költések törlése dátum tartomány, típus vagy ID tartomány szerint, csak staff felhasználóknak. "
+                          "Az ID-k processzenként blokkokban osztódnak ki, így az egyszerre rögzített költések ID-i keverednek: "
+                          "egy ID tartomány más kliensek közben rögzített költéseit is tartalmazhatja. "
+                          "dryRun=true esetén csak a törlendő sorok számát adja vissza. Egyébként háttér feladatként, kis kötegekben "
+                          "töröl; a készültség a GET /jobs/<jobId> végponton követhető.",
+    request_body=ExpensePurgeSerializer,
+    responses={
+        200: openapi.Response(
+            description="Dry run eredménye",
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'count': openapi.Schema(type=openapi.TYPE_INTEGER, description='Törlendő költések száma'),
+                }
+            )
+        ),
+        202: JobStatusSerializer,
+        400: 'Bad Request - hibás adatok',
+        403: 'Forbidden - csak staff felhasználóknak',
+        500: 'Internal server error'
+    },
+    tags=['Expenses']
+)
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def purge_expenses(request):
+    """
+    POST /expenses/purge
+    Költések kötegelt törlése.
+    """
+    try:
+        serializer = ExpensePurgeSerializer(data=request.data)
+        
+        if serializer.is_valid():
+            data = serializer.validated_data
+            if data['dryRun']:
+                count = count_expenses(
+                    date_from=data.get('dateFrom'),
+                    date_to=data.get('dateTo'),
+                    type_ids=data.get('typeIds'),
+                    id_from=data.get('idFrom'),
+                    id_to=data.get('idTo')
+                )
+                return Response({'count': count}, status=status.HTTP_200_OK)
+            
+            params = {key: value for key, value in data.items() if key != 'dryRun'}
+            for key in ('dateFrom', 'dateTo'):
+                if params.get(key):
+                    params[key] = params[key].isoformat()
+            job, created = jobs.submit('purge', params)
+            response_status = status.HTTP_202_ACCEPTED if job.status != jobs.STATUS_DONE else status.HTTP_200_OK
+            return Response(JobStatusSerializer(job).data, status=response_status)
+        else:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            
+    except Exception as e:
+        logger.error(f"Error in purge_expenses: {str(e)}")
+        return Response(
+            {"error": "Internal server error"}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
@@ -0,0 +1,117 @@
+-- sql/mssql.sql
+-- Kiegészítő táblák SQL Serverhez (a TYPES, EXPENSES táblák és a SEQ_EXPENSES,
+-- SEQ_TYPE sequenciák már léteznek).
+
+-- Típusonkénti kumulált napi költés index (expenses/budget_index.py)
+IF OBJECT_ID('TYPE_DAILY_COST', 'U') IS NULL
+CREATE TABLE TYPE_DAILY_COST (
+    TYPE_ID INT NOT NULL,
+    DAY DATE NOT NULL,
+    DAY_COST BIGINT NOT NULL,
+    CUM_COST BIGINT NOT NULL,
+    CONSTRAINT PK_TYPE_DAILY_COST PRIMARY KEY (TYPE_ID, DAY)
+);
+GO
+-- Kezdeti feltöltés a meglévő költésekből: az író végpontok csak a változást vezetik be, üres
+-- indexből negatív vagy hiányos költés jönne ki. Ha a tábla feltöltés nélkül jött létre és már
+-- vannak benne sorok, egyszer futtasd a rebuild_cost_index parancsot.
+IF NOT EXISTS (SELECT 1 FROM TYPE_DAILY_COST)
+INSERT INTO TYPE_DAILY_COST (TYPE_ID, DAY, DAY_COST, CUM_COST)
+SELECT
+    TYPE_ID,
+    DATE_EXP,
+    SUM(COST),
+    SUM(SUM(COST)) OVER (PARTITION BY TYPE_ID ORDER BY DATE_EXP ROWS UNBOUNDED PRECEDING)
+FROM EXPENSES
+WHERE DATE_EXP IS NOT NULL AND COST IS NOT NULL
+GROUP BY TYPE_ID, DATE_EXP;
+GO
+
+-- Változásnapló a delta szinkronizációhoz (expenses/changelog.py)
+-- A CHANGE_NO az INSERT-kor kap értéket, így a commit sorrendje eltérhet a sorszámokétól. Az olvasók
+-- (changes_since, build_snapshot) ezért READCOMMITTEDLOCK hinttel, zároló read committed módon
+-- olvasnak akkor is, ha az adatbázison be van kapcsolva a READ_COMMITTED_SNAPSHOT; a hint nélkül
+-- egy kliens highWaterMark-ja átléphetne egy később commitolt változást.
+IF OBJECT_ID('CHANGE_LOG', 'U') IS NULL
+CREATE TABLE CHANGE_LOG (
+    CHANGE_NO BIGINT IDENTITY(1, 1) NOT NULL CONSTRAINT PK_CHANGE_LOG PRIMARY KEY,
+    ENTITY VARCHAR(10) NOT NULL,
+    ENTITY_ID INT NOT NULL,
+    CHANGED_AT DATETIME2 NOT NULL
+);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_CHANGE_LOG_ENTITY')
+CREATE INDEX IX_CHANGE_LOG_ENTITY ON CHANGE_LOG (ENTITY, ENTITY_ID, CHANGE_NO);
+GO
+IF OBJECT_ID('CHANGE_LOG_STATE', 'U') IS NULL
+CREATE TABLE CHANGE_LOG_STATE (
+    ID INT NOT NULL CONSTRAINT PK_CHANGE_LOG_STATE PRIMARY KEY,
+    FLOOR_NO BIGINT NOT NULL
+);
+GO
+-- A követés kezdetét jelölő bejegyzés: a korábbi adatokhoz (since=0) teljes szinkronizáció kell
+IF NOT EXISTS (SELECT 1 FROM CHANGE_LOG_STATE WHERE ID = 1)
+BEGIN
+    INSERT INTO CHANGE_LOG (ENTITY, ENTITY_ID, CHANGED_AT) VALUES ('init', 0, SYSDATETIME());
+    INSERT INTO CHANGE_LOG_STATE (ID, FLOOR_NO) SELECT 1, MAX(CHANGE_NO) FROM CHANGE_LOG;
+END
+GO
+
+-- Háttér riport feladatok (expenses/jobs.py)
+IF OBJECT_ID('REPORT_JOBS', 'U') IS NULL
+CREATE TABLE REPORT_JOBS (
+    ID INT IDENTITY(1, 1) NOT NULL CONSTRAINT PK_REPORT_JOBS PRIMARY KEY,
+    KIND VARCHAR(30) NOT NULL,
+    PARAMS NVARCHAR(MAX) NOT NULL,
+    PARAMS_KEY VARCHAR(64) NOT NULL,
+    STATUS VARCHAR(10) NOT NULL,
+    PROGRESS INT NOT NULL DEFAULT 0,
+    DATA_VERSION BIGINT NULL,
+    RESULT NVARCHAR(MAX) NULL,
+    ERROR NVARCHAR(MAX) NULL,
+    OWNER VARCHAR(100) NULL,
+    HEARTBEAT_AT DATETIME2 NULL,
+    CREATED_AT DATETIME2 NOT NULL,
+    STARTED_AT DATETIME2 NULL,
+    FINISHED_AT DATETIME2 NULL
+);
+GO
+IF COL_LENGTH('REPORT_JOBS', 'OWNER') IS NULL
+ALTER TABLE REPORT_JOBS ADD OWNER VARCHAR(100) NULL, HEARTBEAT_AT DATETIME2 NULL;
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_REPORT_JOBS_KEY')
+CREATE INDEX IX_REPORT_JOBS_KEY ON REPORT_JOBS (PARAMS_KEY, STATUS);
+GO
+-- Azonos paraméterű feladatból egyszerre csak egy várakozhat vagy futhat (workerek között is)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'UX_REPORT_JOBS_ACTIVE')
+CREATE UNIQUE INDEX UX_REPORT_JOBS_ACTIVE ON REPORT_JOBS (PARAMS_KEY) WHERE STATUS IN ('queued', 'running');
+GO
+
+-- Havi költés hisztogramok a közelítő eloszlás statisztikákhoz (expenses/distribution.py)
+IF OBJECT_ID('MONTHLY_COST_BUCKETS', 'U') IS NULL
+CREATE TABLE MONTHLY_COST_BUCKETS (
+    MONTH CHAR(7) NOT NULL,
+    TYPE_ID INT NOT NULL,
+    BUCKET INT NOT NULL,
+    CNT INT NOT NULL,
+    SUM_COST BIGINT NOT NULL,
+    CONSTRAINT PK_MONTHLY_COST_BUCKETS PRIMARY KEY (MONTH, TYPE_ID, BUCKET)
+);
+GO
+-- Kezdeti feltöltés a meglévő költésekből (mint CostSketches.rebuild): az író végpontok csak a
+-- változást vezetik be. A vödör CEILING(LOG(COST) / LOG(gamma)), a konstans a distribution.py
+-- _LOG_GAMMA értéke; egész költségek nem esnek olyan közel vödörhatárhoz, hogy a kerekítés eltérjen.
+IF NOT EXISTS (SELECT 1 FROM MONTHLY_COST_BUCKETS)
+INSERT INTO MONTHLY_COST_BUCKETS (MONTH, TYPE_ID, BUCKET, CNT, SUM_COST)
+SELECT MONTH, TYPE_ID, BUCKET, COUNT(*), SUM(CAST(COST AS BIGINT))
+FROM (
+    SELECT
+        CONVERT(CHAR(7), DATE_EXP, 120) AS MONTH,
+        TYPE_ID,
+        CASE WHEN COST > 0 THEN CAST(CEILING(LOG(COST) / 0.020000666706669435E0) AS INT) ELSE -1 END AS BUCKET,
+        COST
+    FROM EXPENSES
+    WHERE DATE_EXP IS NOT NULL AND COST IS NOT NULL
+) x
+GROUP BY MONTH, TYPE_ID, BUCKET;
+GO
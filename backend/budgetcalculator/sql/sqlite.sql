@@ -0,0 +1,96 @@
+-- sql/sqlite.sql
+-- Kiegészítő táblák SQLite fejlesztői adatbázishoz (a TYPES és EXPENSES táblák már léteznek).
+
+-- ID blokk-foglalás (expenses/idalloc.py): a SQL Server sequenciák emulálása
+CREATE TABLE IF NOT EXISTS ID_SEQUENCES (
+    NAME VARCHAR(50) PRIMARY KEY,
+    NEXT_VALUE INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO ID_SEQUENCES (NAME, NEXT_VALUE)
+    SELECT 'SEQ_EXPENSES', COALESCE(MAX(ID), 0) + 1 FROM EXPENSES;
+INSERT OR IGNORE INTO ID_SEQUENCES (NAME, NEXT_VALUE)
+    SELECT 'SEQ_TYPE', COALESCE(MAX(ID), 0) + 1 FROM TYPES;
+
+-- Típusonkénti kumulált napi költés index (expenses/budget_index.py)
+CREATE TABLE IF NOT EXISTS TYPE_DAILY_COST (
+    TYPE_ID INTEGER NOT NULL,
+    DAY DATE NOT NULL,
+    DAY_COST INTEGER NOT NULL,
+    CUM_COST INTEGER NOT NULL,
+    PRIMARY KEY (TYPE_ID, DAY)
+);
+-- Kezdeti feltöltés a meglévő költésekből: az író végpontok csak a változást vezetik be, üres
+-- indexből negatív vagy hiányos költés jönne ki. Ha a tábla feltöltés nélkül jött létre és már
+-- vannak benne sorok, egyszer futtasd a rebuild_cost_index parancsot.
+INSERT INTO TYPE_DAILY_COST (TYPE_ID, DAY, DAY_COST, CUM_COST)
+    SELECT
+        TYPE_ID,
+        DATE_EXP,
+        SUM(COST),
+        SUM(SUM(COST)) OVER (PARTITION BY TYPE_ID ORDER BY DATE_EXP ROWS UNBOUNDED PRECEDING)
+    FROM EXPENSES
+    WHERE DATE_EXP IS NOT NULL AND COST IS NOT NULL
+        AND NOT EXISTS (SELECT 1 FROM TYPE_DAILY_COST)
+    GROUP BY TYPE_ID, DATE_EXP;
+
+-- Változásnapló a delta szinkronizációhoz (expenses/changelog.py)
+CREATE TABLE IF NOT EXISTS CHANGE_LOG (
+    CHANGE_NO INTEGER PRIMARY KEY AUTOINCREMENT,
+    ENTITY VARCHAR(10) NOT NULL,
+    ENTITY_ID INTEGER NOT NULL,
+    CHANGED_AT DATETIME NOT NULL
+);
+CREATE INDEX IF NOT EXISTS IX_CHANGE_LOG_ENTITY ON CHANGE_LOG (ENTITY, ENTITY_ID, CHANGE_NO);
+CREATE TABLE IF NOT EXISTS CHANGE_LOG_STATE (
+    ID INTEGER PRIMARY KEY,
+    FLOOR_NO INTEGER NOT NULL
+);
+-- A követés kezdetét jelölő 1-es bejegyzés: a korábbi adatokhoz (since=0) teljes szinkronizáció kell
+INSERT OR IGNORE INTO CHANGE_LOG (CHANGE_NO, ENTITY, ENTITY_ID, CHANGED_AT) VALUES (1, 'init', 0, CURRENT_TIMESTAMP);
+INSERT OR IGNORE INTO CHANGE_LOG_STATE (ID, FLOOR_NO) VALUES (1, 1);
+
+-- Háttér riport feladatok (expenses/jobs.py)
+CREATE TABLE IF NOT EXISTS REPORT_JOBS (
+    ID INTEGER PRIMARY KEY AUTOINCREMENT,
+    KIND VARCHAR(30) NOT NULL,
+    PARAMS TEXT NOT NULL,
+    PARAMS_KEY VARCHAR(64) NOT NULL,
+    STATUS VARCHAR(10) NOT NULL,
+    PROGRESS INTEGER NOT NULL DEFAULT 0,
+    DATA_VERSION INTEGER,
+    RESULT TEXT,
+    ERROR TEXT,
+    OWNER VARCHAR(100),
+    HEARTBEAT_AT DATETIME,
+    CREATED_AT DATETIME NOT NULL,
+    STARTED_AT DATETIME,
+    FINISHED_AT DATETIME
+);
+CREATE INDEX IF NOT EXISTS IX_REPORT_JOBS_KEY ON REPORT_JOBS (PARAMS_KEY, STATUS);
+-- Azonos paraméterű feladatból egyszerre csak egy várakozhat vagy futhat (workerek között is)
+CREATE UNIQUE INDEX IF NOT EXISTS UX_REPORT_JOBS_ACTIVE ON REPORT_JOBS (PARAMS_KEY) WHERE STATUS IN ('queued', 'running');
+
+-- Havi költés hisztogramok a közelítő eloszlás statisztikákhoz (expenses/distribution.py)
+CREATE TABLE IF NOT EXISTS MONTHLY_COST_BUCKETS (
+    MONTH CHAR(7) NOT NULL,
+    TYPE_ID INTEGER NOT NULL,
+    BUCKET INTEGER NOT NULL,
+    CNT INTEGER NOT NULL,
+    SUM_COST INTEGER NOT NULL,
+    PRIMARY KEY (MONTH, TYPE_ID, BUCKET)
+);
+-- Kezdeti feltöltés a meglévő költésekből (mint CostSketches.rebuild); a konstans a distribution.py
+-- _LOG_GAMMA értéke. Az ln() függvényhez SQLite 3.35+ matematikai függvények kellenek.
+INSERT INTO MONTHLY_COST_BUCKETS (MONTH, TYPE_ID, BUCKET, CNT, SUM_COST)
+    SELECT MONTH, TYPE_ID, BUCKET, COUNT(*), SUM(COST)
+    FROM (
+        SELECT
+            substr(DATE_EXP, 1, 7) AS MONTH,
+            TYPE_ID,
+            CASE WHEN COST > 0 THEN CAST(ceil(ln(COST) / 0.020000666706669435) AS INTEGER) ELSE -1 END AS BUCKET,
+            COST
+        FROM EXPENSES
+        WHERE DATE_EXP IS NOT NULL AND COST IS NOT NULL
+            AND NOT EXISTS (SELECT 1 FROM MONTHLY_COST_BUCKETS)
+    )
+    GROUP BY MONTH, TYPE_ID, BUCKET;